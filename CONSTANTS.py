@@ -1,4 +1,5 @@
 CONSTANTS = {
     "RANDOM_SEED": 1337,
-    "BOLASSO_BOOTSTRAPS": 100
+    "BOLASSO_BOOTSTRAPS": 100,
+    "BOLASSO_WORKERS": 8
 }
@@ -1,15 +1,14 @@
+from .betas import BetaStore
 from .connection import Connection
+from .design import DesignMatrix, ReadBlock, ReadDesignMatrix, WriteBlock
+from .evaluate import Accuracy
+from .hdf5 import IterHDF5, ReadHDF5, WriteHDF5
 from .model import *
+from .normalize import Normalizer
+from .pool import SessionPool, get_pool
+from .resample import bootstrap, bootstrap_replicates
+from .sparse import *
 from .sql_exceptions import *
 from .test import *
 
-def bootstrap(data, N, statistic, seed):
-    replicates = sorted(statistic(data.sample(n=len(data),
-                                              replace=True,
-                                              random_state=seed+i))
-                        for i in range(N))
-    ci_lower = replicates[int(0.025 * N)]
-    ci_upper = replicates[int(0.975 * N)]
-    return statistic(data), ci_lower, ci_upper
-
 # vim: syntax=python expandtab sw=4 ts=4
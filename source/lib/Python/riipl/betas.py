@@ -0,0 +1,138 @@
+"""
+Store of bootstrapped lasso coefficients for bolasso, as an HDF5 file with
+variables in rows and bootstraps in columns:
+
+    var         variable names
+    coef        float64 coefficients
+    mask        int8 selection mask (coef != 0)
+    freq        int32 selection frequency of each variable
+    signature   MD5 of each bootstrap's beta csv
+
+Only the bootstraps whose beta csv changed are re-read on update.
+"""
+
+import h5py
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+
+
+class BetaStore(object):
+    """
+    Incrementally updated variables x bootstraps matrix of coefficients.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.var = None
+        self.coef = None
+        self.mask = None
+        self.freq = None
+        self.signature = None
+        if os.path.exists(filename):
+            with h5py.File(filename, "r") as f:
+                self.var = [v.decode("utf-8") for v in f["var"][()]]
+                self.coef = f["coef"][()]
+                self.mask = f["mask"][()]
+                self.freq = f["freq"][()]
+                self.signature = [s.decode("ascii") for s in f["signature"][()]]
+
+
+    def update(self, beta_files):
+        """
+        Update the store from the beta csv files written by gamlr-bootstraps.R,
+        one per bootstrap, and return the number of bootstraps that changed.
+        """
+        signatures = [_signature(beta_file) for beta_file in beta_files]
+        if self.signature is None or len(self.signature) != len(beta_files):
+            changed = list(range(len(beta_files)))
+        else:
+            changed = [i for i, s in enumerate(signatures) if s != self.signature[i]]
+        betas = {i: _read_beta(beta_files[i]) for i in changed}
+
+        var = list(betas[changed[0]].index) if changed else self.var
+        if self.var != var or len(changed) == len(beta_files):
+            # Start over if the variables in the design matrix changed
+            for i in range(len(beta_files)):
+                if i not in betas:
+                    betas[i] = _read_beta(beta_files[i])
+            changed = list(range(len(beta_files)))
+            self.var = var
+            self.coef = np.zeros((len(var), len(beta_files)))
+            self.mask = np.zeros((len(var), len(beta_files)), dtype=np.int8)
+            self.freq = np.zeros(len(var), dtype=np.int32)
+
+        for i in changed:
+            beta = betas[i]
+            if list(beta.index) != self.var:
+                raise ValueError("variables in '{}' do not match the other bootstraps".format(beta_files[i]))
+            mask = (beta.values != 0).astype(np.int8)
+            self.freq += mask - self.mask[:, i]
+            self.mask[:, i] = mask
+            self.coef[:, i] = beta.values
+        self.signature = signatures
+
+        self._save()
+        print("[riipl.betas] updated {} of {} bootstraps".format(len(changed), len(beta_files)))
+        return len(changed)
+
+
+    def stats(self, alpha=0.05):
+        """
+        Return the stability of each variable's selection across bootstraps:
+        selection frequency and probability, sign consistency (the share of
+        selections with the most common sign), and the mean and bootstrap
+        confidence interval of the coefficient.
+        """
+        nboot = self.coef.shape[1]
+        positive = (self.coef > 0).sum(axis=1)
+        negative = (self.coef < 0).sum(axis=1)
+        lower, upper = np.percentile(self.coef, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sign = np.maximum(positive, negative) / self.freq
+        return pd.DataFrame({"freq": self.freq,
+                             "prob": self.freq / nboot,
+                             "sign_consistency": sign,
+                             "coef_mean": self.coef.mean(axis=1),
+                             "coef_lower": lower,
+                             "coef_upper": upper},
+                            index=pd.Index(self.var, name="var"))
+
+
+    def selections(self):
+        """
+        Return the selection mask as a dataframe with a column per bootstrap.
+        """
+        return pd.DataFrame(self.mask,
+                            index=pd.Index(self.var, name="var"),
+                            columns=["bootstrap{}".format(i) for i in range(self.mask.shape[1])])
+
+
+    def _save(self):
+        """
+        Write the store atomically, so that an interrupted update leaves the
+        previous version intact.
+        """
+        tmp = self.filename + ".tmp"
+        with h5py.File(tmp, "w") as f:
+            f.create_dataset("var", data=np.char.encode(np.array(self.var, dtype=str), "utf-8"))
+            f.create_dataset("coef", data=self.coef)
+            f.create_dataset("mask", data=self.mask)
+            f.create_dataset("freq", data=self.freq)
+            f.create_dataset("signature", data=np.array(self.signature, dtype="S32"))
+        os.replace(tmp, self.filename)
+
+
+def _signature(filename):
+    with open(filename, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def _read_beta(filename):
+    """
+    Read a beta csv written by R's write.csv of a named coefficient vector.
+    """
+    return pd.read_csv(filename, names=["var", "coef"], skiprows=1, index_col="var").coef
+
+# vim: expandtab sw=4 ts=4
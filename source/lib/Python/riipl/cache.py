@@ -0,0 +1,155 @@
+"""
+Cache of population tables shared by the feature scripts in a build.
+"""
+
+import collections
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+import shutil
+import tempfile
+import threading
+from riipl.pool import get_pool
+
+
+class PopulationCache(object):
+    """
+    LRU cache of population dataframes, keyed by the table, its key columns,
+    any extra columns and the table's checksum comment.
+
+    Up to `maxsize` populations are held in memory. Populations of tables
+    with a checksum are also persisted to `directory`, with one .npy file per
+    column, so that later processes can memory-map them instead of querying
+    Oracle again. The directory defaults to the RIIPL_POPULATION_CACHE
+    environment variable, or scratch/.population-cache in the repo.
+    """
+
+    def __init__(self, maxsize=4, directory=None):
+        if directory is None:
+            directory = os.environ.get("RIIPL_POPULATION_CACHE",
+                                       os.path.join(os.environ.get("REPO_ROOT", "."),
+                                                    "scratch", ".population-cache"))
+        self.maxsize = maxsize
+        self.directory = directory
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, table, keys, columns=[]):
+        """
+        Return the population in `table`, sorted by the `keys`, with the key
+        columns and any extra `columns`.
+        """
+        if isinstance(keys, str):
+            keys = [keys]
+        checksum = self._checksum(table)
+        key = (table.upper(), tuple(keys), tuple(columns), checksum)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        path = None
+        if checksum:
+            name = hashlib.md5(repr(key).encode("utf-8")).hexdigest()
+            path = os.path.join(self.directory, name)
+        if path is not None and os.path.isdir(path):
+            population = self._load(path)
+        else:
+            with get_pool().session() as cxn:
+                population = pd.read_sql("""
+                                         SELECT {c} FROM {t} ORDER BY {k}
+                                         """.format(t=table,
+                                                    k=",".join(keys),
+                                                    c=",".join(list(keys) + list(columns))), cxn)
+            if path is not None:
+                self._save(population, path)
+
+        with self._lock:
+            self._cache[key] = population
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return population
+
+
+    def clear(self):
+        """
+        Empty the in-memory cache.
+        """
+        with self._lock:
+            self._cache.clear()
+
+
+    def _checksum(self, table):
+        """
+        Look up the checksum stored in the table's comment.
+        """
+        owner, _, name = table.upper().rpartition(".")
+        with get_pool().session() as cxn:
+            cursor = cxn.cursor()
+            if owner:
+                cursor.execute("""
+                               SELECT comments
+                                 FROM all_tab_comments
+                                WHERE owner = :owner AND table_name = :name
+                               """, owner=owner, name=name)
+            else:
+                cursor.execute("""
+                               SELECT comments
+                                 FROM user_tab_comments
+                                WHERE table_name = :name
+                               """, name=name)
+            row = cursor.fetchone()
+            cursor.close()
+        return row[0] if row is not None else None
+
+
+    def _load(self, path):
+        """
+        Memory-map a persisted population. String columns are read into
+        memory, since pandas stores them as objects, and their missing values
+        are restored from the null mask.
+        """
+        with open(os.path.join(path, "columns.txt")) as f:
+            columns = f.read().splitlines()
+        data = {}
+        for i, c in enumerate(columns):
+            values = np.load(os.path.join(path, "{}.npy".format(i)), mmap_mode="r")
+            mask = os.path.join(path, "{}.mask.npy".format(i))
+            if os.path.exists(mask):
+                values = values.astype(object)
+                values[np.load(mask)] = None
+            data[c] = values
+        # copy=False keeps one block per column, instead of consolidating
+        # (and so copying) the memory-mapped arrays
+        return pd.DataFrame(data, columns=columns, copy=False)
+
+
+    def _save(self, population, path):
+        """
+        Persist a population atomically, so that concurrent processes never
+        see a partially written directory.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+        try:
+            for i, c in enumerate(population.columns):
+                values = np.asarray(population[c])
+                if values.dtype == object:
+                    # Save strings as a fixed-width array, with a mask of
+                    # the missing values, which would otherwise be saved as
+                    # the strings "None" or "nan"
+                    mask = np.asarray(population[c].isnull())
+                    values = np.where(mask, "", values).astype(str)
+                    np.save(os.path.join(tmp, "{}.mask.npy".format(i)), mask)
+                np.save(os.path.join(tmp, "{}.npy".format(i)), values)
+            with open(os.path.join(tmp, "columns.txt"), "w") as f:
+                f.write("\n".join(population.columns) + "\n")
+            os.rename(tmp, path)
+        except OSError:
+            # Another process persisted the same population first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+# vim: expandtab sw=4 ts=4
@@ -1,19 +1,135 @@
-import csv
 import cx_Oracle
+import functools
 import hashlib
-import inspect
+import itertools
 import pandas as pd
 import os
 import re
 import subprocess
+import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from . import spool
+from .pool import get_pool
 from .sql_exceptions import *
 
+_param_re = re.compile(r"'%(\w+)%'|%(\w+)%")
+
+@functools.lru_cache(maxsize=1024)
+def _parse_template(sql):
+    """
+    Parse a SQL template with %name% parameters (optionally enclosed in single
+    quotes) into its literal pieces, the parameter names, whether each one
+    was quoted and whether each one falls inside a longer string literal,
+    along with an equivalent statement that uses one bind variable per
+    distinct name, and those names in bind order. Oracle does not bind inside
+    string literals, so the bind statement is None if any parameter does.
+    """
+    pieces, params, quoted, literal = [], [], [], []
+    last = 0
+    quotes = 0
+    for match in _param_re.finditer(sql):
+        piece = sql[last:match.start()]
+        quotes += piece.count("'")
+        pieces.append(piece)
+        params.append(match.group(1) or match.group(2))
+        quoted.append(match.group(1) is not None)
+        literal.append(match.group(2) is not None and quotes % 2 == 1)
+        last = match.end()
+    pieces.append(sql[last:])
+    names = []
+    for param in params:
+        if param not in names:
+            names.append(param)
+    if any(literal):
+        bind_sql = None
+    else:
+        bind_sql = [pieces[0]]
+        for param, piece in zip(params, pieces[1:]):
+            bind_sql.append(":b{}".format(names.index(param)))
+            bind_sql.append(piece)
+        bind_sql = "".join(bind_sql)
+    return tuple(pieces), tuple(params), tuple(quoted), tuple(literal), bind_sql, tuple(names)
+
+
+def _find(frame, key):
+    """
+    Look up a parameter in a frame's local and global scope, then the environment.
+    """
+    for scope in [frame.f_locals, frame.f_globals, os.environ]:
+        if key in scope:
+            return scope[key]
+    raise NameError("Variable '{}' not found in local/global scope or ENV".format(key))
+
+
+def _batched(rows, size):
+    """
+    Split an iterable into lists of at most `size` items.
+    """
+    rows = iter(rows)
+    batch = list(itertools.islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(rows, size))
+
+
+def _bind_value(value):
+    """
+    Convert numpy scalars to the equivalent Python values for binding.
+    """
+    return value.item() if hasattr(value, "item") else value
+
+
+def _input_size(series):
+    """
+    Map a pandas dtype to the cx_Oracle bind type used for array inserts.
+    """
+    kind = series.dtype.kind
+    if kind == "f":
+        return cx_Oracle.NATIVE_FLOAT
+    elif kind in "iub":
+        return cx_Oracle.NUMBER
+    elif kind == "M":
+        return cx_Oracle.DATETIME
+    else:
+        # Strings are bound with the maximum length in the column
+        lengths = series.dropna().astype(str).str.len()
+        return max(1, int(lengths.max())) if len(lengths) else 1
+
+
+def _column_buffer(series):
+    """
+    Convert a pandas column to a list of bindable Python values, with missing
+    values as None.
+    """
+    if series.dtype.kind == "b":
+        series = series.astype(int)
+    return series.astype(object).where(series.notnull(), None).tolist()
+
+
+def _frame_from_rows(rows, description):
+    """
+    Build a typed dataframe from fetched rows, using the cursor description
+    to parse dates and to keep integer columns without missing values as ints.
+    """
+    names = [d[0] for d in description]
+    frame = pd.DataFrame.from_records(rows, columns=names, coerce_float=True)
+    for name, dbtype, _, _, precision, scale, _ in description:
+        if dbtype == cx_Oracle.DATETIME or dbtype == cx_Oracle.TIMESTAMP:
+            frame[name] = pd.to_datetime(frame[name])
+        elif dbtype == cx_Oracle.NUMBER and scale == 0 and precision:
+            if frame[name].notnull().all():
+                frame[name] = frame[name].astype("int64")
+    return frame
+
+
 class Connection:
 
-    def __init__(self):
+    def __init__(self, pool=None, binds=False):
         self.schema = os.environ["USER"].upper()
-        self._connection = cx_Oracle.connect("/")
+        self.binds = binds
+        self._pool = pool or get_pool()
+        self._connection = self._pool.acquire()
 
 
     def _die_if_not_connected(self):
@@ -32,49 +148,179 @@ class Connection:
     def close(self):
         self._die_if_not_connected()
         try:
-            self._connection.close()
+            self._pool.release(self._connection)
             self._connection = None
         except cx_Oracle.ProgrammingError:
             pass
 
 
-    def _prepare_sql(self, sql):
+    def _prepare_sql(self, sql, binds=False):
         """
         Helper method for automating the process of pasting parameter values into 
         SQL queries
-        """
-        # IMPORTANT NOTE: If the nesting depth of _prepare_sql is changed the indexing on the
-        # calling stack -must- be updated 
-        caller = inspect.stack()[2][0]
-
-        # Find and replace parameters
-        def _find(key):
-            for scope in [caller.f_locals, caller.f_globals, os.environ]:
-                if key in scope:
-                    return str(scope[key])
-            raise NameError("Variable '{}' not found in local/global scope or ENV".format(key))
-
-        for param in re.findall("(\%\w+\%)", sql):
-            sql = sql.replace(param, _find(param.replace("%", "")))
 
-        return sql
-
-
-    def execute(self, sql, commit=True, verbose=False):
+        With binds=True, parameters are converted to bind variables instead, and
+        a (sql, binds) tuple is returned.
+        """
+        # IMPORTANT NOTE: If the nesting depth of _prepare_sql is changed the frame
+        # index of the caller -must- be updated
+        caller = sys._getframe(2)
+
+        pieces, params, quoted, literal, bind_sql, names = _parse_template(sql)
+
+        if binds and bind_sql is not None:
+            return bind_sql, {"b{}".format(i): _bind_value(_find(caller, name))
+                              for i, name in enumerate(names)}
+        elif binds:
+            # Paste the parameters that fall inside string literals, and bind
+            # the rest
+            sql, values = [pieces[0]], {}
+            for param, lit, piece in zip(params, literal, pieces[1:]):
+                if lit:
+                    sql.append(str(_find(caller, param)))
+                else:
+                    key = "b{}".format(names.index(param))
+                    values[key] = _bind_value(_find(caller, param))
+                    sql.append(":" + key)
+                sql.append(piece)
+            return "".join(sql), values
+
+        # Paste parameters
+        values = {name: str(_find(caller, name)) for name in names}
+        sql = [pieces[0]]
+        for param, q, piece in zip(params, quoted, pieces[1:]):
+            sql.append("'{}'".format(values[param]) if q else values[param])
+            sql.append(piece)
+        return "".join(sql)
+
+
+    def execute(self, sql, commit=True, verbose=False, binds=None):
         """
         Execute a SQL statement and return the resulting cursor.
+
+        If `binds` is True (or None and the Connection was created with
+        binds=True), parameters are passed as bind variables rather than
+        pasted into the SQL, so that Oracle can reuse the parsed statement.
+        Parameters inside a longer string literal, e.g. 'pre_%name%', are
+        still pasted, since Oracle does not bind inside literals.
         """
         self._die_if_not_connected()
         cursor = self._connection.cursor()
-        sql = self._prepare_sql(sql)
-        if (verbose is True):
-            print(sql)
-        cursor.execute(sql)
+        if binds is None:
+            binds = self.binds
+        if binds:
+            sql, values = self._prepare_sql(sql, binds=True)
+            if (verbose is True):
+                print(sql, values)
+            cursor.execute(sql, values)
+        else:
+            sql = self._prepare_sql(sql)
+            if (verbose is True):
+                print(sql)
+            cursor.execute(sql)
         if (commit is True): 
             self._connection.commit()
         return cursor 
 
 
+    def executemany(self, sql, rows, batch_size=10000, commit_every=None, batcherrors=False,
+                    fields=None):
+        """
+        Execute a DML statement for each of the `rows`, sending them to Oracle
+        in array batches of `batch_size` rows.
+
+        The `rows` may be a dataframe or a sequence of dicts or tuples. A %name%
+        parameter that names a dataframe column or dict key is bound to that
+        field of each row; any other %name% parameter is pasted from the
+        caller's scope as with `execute`. Tuple rows are bound to positional
+        binds (:1, :2, ...) in the SQL, or, if `fields` names the values in
+        each tuple, to the %name% parameters with those names. Dict rows can
+        also use named binds (:name) directly.
+
+        Commits once at the end, or after every `commit_every` batches. With
+        `batcherrors=True`, rows that fail are skipped instead of aborting the
+        batch, and a list of (row number, error message) tuples is returned.
+        """
+        self._die_if_not_connected()
+        is_frame = isinstance(rows, pd.DataFrame)
+        positional = False
+        if is_frame:
+            fields = list(rows.columns)
+        else:
+            rows = iter(rows)
+            first = next(rows, None)
+            if first is None:
+                return []
+            rows = itertools.chain([first], rows)
+            if isinstance(first, dict):
+                fields = list(first.keys())
+            else:
+                positional = True
+                fields = list(fields or [])
+                if fields and len(fields) != len(first):
+                    raise ValueError("Rows have {} values, but {} fields are named: {}".format(
+                                     len(first), len(fields), ", ".join(fields)))
+        sql, order = self._prepare_batch_sql(sql, fields, positional)
+
+        cursor = self._connection.cursor()
+        if is_frame:
+            order = order or fields
+            cursor.setinputsizes(*[_input_size(rows[c]) for c in order])
+            batches = (list(zip(*[_column_buffer(rows[c].iloc[i:i+batch_size]) for c in order]))
+                       for i in range(0, len(rows), batch_size))
+        elif order is not None:
+            batches = ([tuple(_bind_value(row[c]) for c in order) for row in batch]
+                       for batch in _batched(rows, batch_size))
+        else:
+            batches = (list(batch) for batch in _batched(rows, batch_size))
+
+        errors = []
+        nrows = 0
+        for i, batch in enumerate(batches, start=1):
+            cursor.executemany(sql, batch, batcherrors=batcherrors)
+            if batcherrors:
+                errors.extend((nrows + e.offset, e.message) for e in cursor.getbatcherrors())
+            nrows += len(batch)
+            if commit_every and i % commit_every == 0:
+                self._connection.commit()
+        self._connection.commit()
+        cursor.close()
+
+        print("executemany: {} rows, {} errors".format(nrows, len(errors)))
+        return errors
+
+
+    def _prepare_batch_sql(self, sql, fields, positional=False):
+        """
+        Helper for `executemany` that converts %name% parameters to positional
+        binds when `fields` includes the name, and pastes the rest from the
+        caller's scope. Returns the SQL and the field name for each bind
+        position, or None if no parameters are bound.
+
+        For tuple rows (`positional` is True), the index of the field in
+        `fields` is returned for each bind position instead.
+        """
+        pieces, params, quoted, literal, _, _ = _parse_template(sql)
+        if not params:
+            return sql, None
+        caller = sys._getframe(2)
+        positions = {param: i for i, param in enumerate(fields)} if positional else None
+        order = []
+        sql = [pieces[0]]
+        for param, q, lit, piece in zip(params, quoted, literal, pieces[1:]):
+            if lit and param in fields:
+                raise ValueError("Row field '{}' is used inside a string literal, "
+                                 "where Oracle cannot bind it".format(param))
+            if not lit and param in fields:
+                order.append(positions[param] if positions else param)
+                sql.append(":{}".format(len(order)))
+            else:
+                value = str(_find(caller, param))
+                sql.append("'{}'".format(value) if q else value)
+            sql.append(piece)
+        return "".join(sql), order or None
+
+
     def get_columns(self, table):
         """
         Return a (name, type) list of columns for the table.
@@ -88,17 +334,27 @@ class Connection:
         return self.execute(sql).fetchall()
 
 
-    def get_checksum(self, table):
+    def get_checksum(self, table, mode=None, degree=8, sample_percent=1.0, seed=0):
         """
         Calculate a checksum for a read-only table as a hash of all the
         fields concatenated with the column names and types.
+
+        The `mode` is one of:
+          "full"     - hash every row in a serial scan
+          "parallel" - hash every row with a parallel scan of `degree` servers;
+                       the partial sums are combined by Oracle, so the result
+                       is identical to "full"
+          "sample"   - hash a repeatable `sample_percent` block sample; this is
+                       only suitable for development builds, and the checksum
+                       is tagged so it never matches a full checksum
+
+        If `mode` is None, it is read from the RIIPL_CHECKSUM_MODE environment
+        variable, defaulting to "full".
         """
-        cur = self.execute("""
-                           SELECT column_name, data_type
-                             FROM user_tab_columns
-                            WHERE table_name = '{}'
-                         ORDER BY column_id
-                           """.format(table.upper()))
+        if mode is None:
+            mode = os.environ.get("RIIPL_CHECKSUM_MODE", "full")
+        if mode not in ("full", "parallel", "sample"):
+            raise ValueError("unknown checksum mode '{}'".format(mode))
         columns = self.get_columns(table)
         if not columns: return ""
         m = hashlib.sha256()
@@ -106,41 +362,93 @@ class Connection:
         table_hash = m.hexdigest()
         # Hash the columns values in each row, but sum the hashes across rows so
         # that row ordering does not impact the checksum.
-        cur = self.execute("""
-                           SELECT CAST(SUM(ORA_HASH({})) AS VARCHAR2(255))
-                             FROM {}
-                           """.format(" || '|' || ".join('"{}"'.format(c[0]) for c in columns),
-                                      table.upper()))
+        row_hash = "ORA_HASH({})".format(" || '|' || ".join('"{}"'.format(c[0]) for c in columns))
+        if mode == "parallel":
+            sql = "SELECT /*+ PARALLEL(t, {}) */ CAST(SUM({}) AS VARCHAR2(255)) FROM {} t"
+            sql = sql.format(int(degree), row_hash, table.upper())
+        elif mode == "sample":
+            sql = "SELECT CAST(SUM({}) AS VARCHAR2(255)) FROM {} SAMPLE BLOCK ({}) SEED ({})"
+            sql = sql.format(row_hash, table.upper(), float(sample_percent), int(seed))
+        else:
+            sql = "SELECT CAST(SUM({}) AS VARCHAR2(255)) FROM {}".format(row_hash, table.upper())
+        cur = self.execute(sql)
         # Combine the data hash and the table schema hash
         checksum = "{}:{}".format(cur.fetchone()[0], table_hash)
+        if mode == "sample":
+            checksum = "sample{}:{}".format(sample_percent, checksum)
         print("checksum for '{}': {}".format(table, checksum))
         return checksum
 
 
-    def get_stats(self, table):
+    def get_stats(self, table, quantiles=None, distinct=False, chunksize=1000, sessions=4, degree=None):
         """
         Returns a dataframe containing summary stats for each column in the table.
+
+        Optionally adds approximate distinct counts (`distinct=True`) and
+        approximate `quantiles` (e.g. [0.25, 0.5, 0.75]) for numeric columns.
+        Columns are split into statements of at most `chunksize` select-list
+        expressions (Oracle allows 1000), which run concurrently on up to
+        `sessions` database sessions, each with an optional PARALLEL hint of
+        the given `degree`.
         """
-        # Build and run queries for summary stats
-        sql = []
+        quantiles = list(quantiles or [])
+        stats = ["COUNT", "AVG", "STDDEV", "MIN", "MAX"]
+        if distinct:
+            stats.append("DISTINCT")
+        stats.extend("P{:g}".format(100 * q) for q in quantiles)
+
+        # Build the aggregates for each column, with NULL placeholders so that
+        # every column has the same number of stats
         columns = self.get_columns(table)
+        aggregates = []
         for col, dtype in columns:
             if (dtype == "NUMBER" or dtype == "LONG"):
-                sql.append('COUNT("{0}"), AVG("{0}"), STDDEV("{0}"), MIN("{0}"), MAX("{0}")'.format(col))
+                agg = ['COUNT("{0}"), AVG("{0}"), STDDEV("{0}"), MIN("{0}"), MAX("{0}")'.format(col)]
             elif (dtype == "DATE"):
-                sql.append('COUNT("{0}"), NULL, NULL, MIN("{0}"), MAX("{0}")'.format(col))
+                agg = ['COUNT("{0}"), NULL, NULL, MIN("{0}"), MAX("{0}")'.format(col)]
             else:
-                sql.append('COUNT("{}"), NULL, NULL, NULL, NULL'.format(col))
-        sql = "SELECT {} FROM {}".format(", ".join(sql), table)
-        stats = self.execute(sql).fetchone()
+                agg = ['COUNT("{}"), NULL, NULL, NULL, NULL'.format(col)]
+            if distinct:
+                agg.append('APPROX_COUNT_DISTINCT("{}")'.format(col))
+            for q in quantiles:
+                if (dtype == "NUMBER" or dtype == "LONG"):
+                    agg.append('APPROX_PERCENTILE({}) WITHIN GROUP (ORDER BY "{}")'.format(q, col))
+                else:
+                    agg.append("NULL")
+            aggregates.append(", ".join(agg))
+
+        # Build and run queries for summary stats
+        hint = "/*+ PARALLEL({}) */ ".format(int(degree)) if degree else ""
+        per_statement = max(1, chunksize // len(stats))
+        sql = ["SELECT {}{} FROM {}".format(hint, ", ".join(aggregates[i:i+per_statement]), table)
+               for i in range(0, len(aggregates), per_statement)]
+        if len(sql) == 1:
+            values = list(self.execute(sql[0]).fetchone())
+        else:
+            values = [x for row in self._fetchone_concurrently(sql, sessions) for x in row]
 
         # Return them as a dataframe
         frame = pd.DataFrame(data=[x[0] for x in columns], columns=["Variable"])
-        for i, stat in enumerate(["COUNT", "AVG", "STDDEV", "MIN", "MAX"]):
-            frame[stat] = stats[i::5]
+        for i, stat in enumerate(stats):
+            frame[stat] = values[i::len(stats)]
         return frame
 
 
+    def _fetchone_concurrently(self, statements, sessions):
+        """
+        Run independent queries concurrently on separate sessions from the pool
+        and return the first row of each, in order.
+        """
+        def _fetchone(sql):
+            with self._pool.session() as cxn:
+                cursor = cxn.cursor()
+                cursor.execute(sql)
+                return cursor.fetchone()
+
+        with ThreadPoolExecutor(max_workers=max(1, min(sessions, len(statements)))) as pool:
+            return list(pool.map(_fetchone, statements))
+
+
     def clear_tables(self, tables, cascade_constraints=True):
         """
         Drops and purges tables.
@@ -156,7 +464,7 @@ class Connection:
         for table in tables:
             print("Clearing table:", table)
             try:
-                self.execute("DROP TABLE %table% %options%PURGE")
+                self.execute("DROP TABLE %table% %options%PURGE", binds=False)
             # cx_Oracle.DatabaseError: ORA-00942: table or view does not exist
             except cx_Oracle.DatabaseError as rc:
                 if not "ORA-00942" in str(rc):
@@ -175,9 +483,10 @@ class Connection:
 
         key_str = ", ".join(keys)
         key_name = "{}_PK".format(table.upper())
-        self.execute("ALTER TABLE %table% ADD CONSTRAINT %key_name% PRIMARY KEY (%key_str%) DISABLE")
-        self.execute("CREATE UNIQUE INDEX %key_name% ON %table% (%key_str%)")
-        self.execute("ALTER TABLE %table% ENABLE PRIMARY KEY")
+        self.execute("ALTER TABLE %table% ADD CONSTRAINT %key_name% PRIMARY KEY (%key_str%) DISABLE",
+                     binds=False)
+        self.execute("CREATE UNIQUE INDEX %key_name% ON %table% (%key_str%)", binds=False)
+        self.execute("ALTER TABLE %table% ENABLE PRIMARY KEY", binds=False)
 
 
     def read_csv(self, filename, schema, table, delim=","):
@@ -219,28 +528,48 @@ TRAILING NULLCOLS
             f.write(ctl)
 
         # Clear and create the sql table
-        self.clear_tables(table)
-        columns = ['"{}" {}'.format(x[0], x[1].partition(" ")[0]) for x in schema if x[1] is not "FILLER"]
-        sql = "CREATE TABLE {} ({})".format(table, ",\n  ".join(columns))
-        self.execute(sql, verbose=True)
+        self._create_table(table, schema)
 
         # Launch sqlldr with subprocess
         subprocess.check_call(["sqlldr",
                                "userid='/',control={0},log={0}.log".format(ctlfile, filename)])
-        # Make table read-only
-        self.execute("ALTER TABLE {} READ ONLY".format(table), verbose=True)
 
-        # Store checksum of contents as the table's comment
-        self.execute("COMMENT ON TABLE {} IS '{}'".format(table, self.get_checksum(table)))
+        # Make table read-only and store its checksum
+        self._finalize_table(table)
 
         # Cleanup ctl file
         os.unlink(ctlfile)
         os.unlink(ctlfile + ".log")
 
 
-    def read_dataframe(self, df, tablename, schema=None):
+    def _create_table(self, table, schema):
+        """
+        Drop any existing table and create an empty one from a (name, type) schema.
+        """
+        self.clear_tables(table)
+        columns = ['"{}" {}'.format(x[0], x[1].partition(" ")[0]) for x in schema if x[1] != "FILLER"]
+        sql = "CREATE TABLE {} ({})".format(table, ",\n  ".join(columns))
+        self.execute(sql, verbose=True)
+
+
+    def _finalize_table(self, table):
         """
-        Load a pandas dataframe into a SQL table with sqlldr.
+        Mark a freshly loaded table read-only, store the checksum of its
+        contents as the table's comment, and gather optimizer statistics.
+        """
+        self.execute("ALTER TABLE {} READ ONLY".format(table), verbose=True)
+        self.execute("COMMENT ON TABLE {} IS '{}'".format(table, self.get_checksum(table)))
+        self.execute("ANALYZE TABLE {} COMPUTE STATISTICS".format(table))
+
+
+    def read_dataframe(self, df, tablename, schema=None, mode="sqlldr", batch_size=50000):
+        """
+        Load a pandas dataframe into a SQL table.
+
+        With mode="sqlldr", the dataframe is written to a temporary csv file and
+        loaded with `read_csv`. With mode="executemany", the rows are inserted
+        in-process with array-bound inserts of `batch_size` rows at a time,
+        avoiding the text round trip.
         """
         # Infer the schema from the pandas dtypes
         if schema is None:
@@ -250,37 +579,153 @@ TRAILING NULLCOLS
             }
             schema = [(c, dtypes.get(str(df.dtypes[c]), "NUMBER")) for c in df.columns]
 
-        # Write csv to temporary file
-        fd, csvfile = tempfile.mkstemp(prefix="riipl_connection_", suffix=".csv")
-        with os.fdopen(fd, "w") as f:
-            df.to_csv(f, index=False)
+        if mode == "sqlldr":
+            # Write csv to temporary file
+            fd, csvfile = tempfile.mkstemp(prefix="riipl_connection_", suffix=".csv")
+            with os.fdopen(fd, "w") as f:
+                df.to_csv(f, index=False)
+
+            # Load with sqlldr
+            self.read_csv(csvfile, schema, tablename)
 
-        # Load with sqlldr
-        self.read_csv(csvfile, schema, tablename)
+            # Cleanup csv file
+            os.unlink(csvfile)
 
-        # Cleanup csv file
-        os.unlink(csvfile)
+        elif mode == "executemany":
+            self._create_table(tablename, schema)
+            self._insert_dataframe(df, tablename, [x[0] for x in schema if x[1] != "FILLER"], batch_size)
+            self._finalize_table(tablename)
+
+        else:
+            raise ValueError("unknown mode '{}'".format(mode))
+
+
+    def _insert_dataframe(self, df, table, columns, batch_size):
+        """
+        Insert the `columns` of a dataframe into an existing table using
+        direct-path array inserts, with bind types inferred from the dtypes.
+        """
+        sql = "INSERT /*+ APPEND_VALUES */ INTO {} ({}) VALUES ({})".format(
+                  table,
+                  ", ".join('"{}"'.format(c) for c in columns),
+                  ", ".join(":{}".format(i) for i in range(1, len(columns) + 1)))
+        # A direct-path insert must be committed before the table is touched again
+        self.executemany(sql, df[columns], batch_size=batch_size, commit_every=1)
 
 
-    def spool_to_csv(self, cursor, csv_path, header=True, BATCH_SIZE=10000):
-        with open(csv_path, "w") as csv_f:
-            writer = csv.writer(csv_f)
+    def read_sql_chunks(self, sql, chunksize=100000, arraysize=None, binds=None):
+        """
+        Run a query and return a generator of dataframes with at most
+        `chunksize` rows each, built directly from `fetchmany` batches.
+        Parameters are pasted into the SQL (or bound) as with `execute`.
+        """
+        self._die_if_not_connected()
+        if binds is None:
+            binds = self.binds
+        if binds:
+            sql, values = self._prepare_sql(sql, binds=True)
+        else:
+            sql, values = self._prepare_sql(sql), {}
+        cursor = self._connection.cursor()
+        # Fetch each chunk in a single round trip, and prefetch the first
+        # batch with the execute call.
+        cursor.arraysize = arraysize or chunksize
+        if hasattr(cursor, "prefetchrows"):
+            cursor.prefetchrows = cursor.arraysize + 1
+        cursor.execute(sql, values)
+        return self._iter_chunks(cursor, chunksize)
 
-            if header:
-                writer.writerow([column[0] for column in cursor.description])
 
-            rows = cursor.fetchmany(BATCH_SIZE)
+    def _iter_chunks(self, cursor, chunksize):
+        """
+        Generator helper for `read_sql_chunks`, so that the query is prepared
+        and executed before the first chunk is requested.
+        """
+        try:
+            rows = cursor.fetchmany(chunksize)
             while rows:
-                writer.writerows(rows)
-                rows = cursor.fetchmany(BATCH_SIZE)
+                yield _frame_from_rows(rows, cursor.description)
+                rows = cursor.fetchmany(chunksize)
+        finally:
+            cursor.close()
 
 
-    def save_table(self, table, key=None, checksum=True):
+    def spool_to_csv(self, cursor, csv_path, header=True, BATCH_SIZE=10000, format=None):
+        """
+        Write the results of an executed cursor to a file, fetching batches of
+        BATCH_SIZE rows on a background thread while the previous batch is
+        written. The format is inferred from the extension (.csv, .csv.gz,
+        .csv.zst, .parquet or .feather) unless `format` is given.
+        """
+        cursor.arraysize = BATCH_SIZE
+        writer = spool.open_writer(csv_path, cursor.description, header, format)
+        try:
+            n = spool.spool(cursor, writer, BATCH_SIZE)
+        finally:
+            writer.close()
+        print("spooled {} rows to {}".format(n, csv_path))
+
+
+    def spool_table(self, table, path, shards=4, columns="*", header=True, BATCH_SIZE=50000, format=None):
+        """
+        Write a table to `shards` files in parallel, by splitting it into ROWID
+        ranges that are read on separate sessions. The `path` must contain a
+        "{}" placeholder for the shard number. Returns the list of files.
+        """
+        # Split the table's extents into shards with balanced numbers of blocks
+        extents = self.execute("""
+                               SELECT DBMS_ROWID.ROWID_CREATE(1, o.data_object_id, e.relative_fno,
+                                                              e.block_id, 0),
+                                      DBMS_ROWID.ROWID_CREATE(1, o.data_object_id, e.relative_fno,
+                                                              e.block_id + e.blocks - 1, 32767),
+                                      e.blocks
+                                 FROM user_extents e, user_objects o
+                                WHERE e.segment_name = '{0}' AND
+                                      e.segment_type = 'TABLE' AND
+                                      o.object_name = '{0}' AND
+                                      o.object_type = 'TABLE'
+                               """.format(table.upper())).fetchall()
+        ranges = [[] for _ in range(shards)]
+        blocks = [0] * shards
+        for lo, hi, n in sorted(extents, key=lambda x: -x[2]):
+            i = blocks.index(min(blocks))
+            ranges[i].append((lo, hi))
+            blocks[i] += n
+
+        sql = "SELECT {} FROM {} WHERE ROWID BETWEEN :lo AND :hi".format(columns, table)
+        describe = "SELECT {} FROM {} WHERE 1 = 0".format(columns, table)
+
+        def _spool_shard(shard):
+            filename = path.format(shard)
+            with self._pool.session() as cxn:
+                cursor = cxn.cursor()
+                cursor.arraysize = BATCH_SIZE
+                cursor.execute(describe)
+                writer = spool.open_writer(filename, cursor.description, header, format)
+                try:
+                    for lo, hi in ranges[shard]:
+                        cursor.execute(sql, lo=lo, hi=hi)
+                        rows = cursor.fetchmany(BATCH_SIZE)
+                        while rows:
+                            writer.write(rows)
+                            rows = cursor.fetchmany(BATCH_SIZE)
+                finally:
+                    writer.close()
+            return filename
+
+        with ThreadPoolExecutor(max_workers=shards) as pool:
+            filenames = list(pool.map(_spool_shard, range(shards)))
+        print("spooled {} to {} shards".format(table, shards))
+        return filenames
+
+
+    def save_table(self, table, key=None, checksum=True, quantiles=None, distinct=False):
         """
         Helper method to finalize a permanent SQL table by creating a primary key,
         marking it read-only, and storing a checksum of the contents as a comment.
 
-        Prints and returns summary statistics for the table.
+        Prints and returns summary statistics for the table, optionally with
+        approximate quantiles and distinct counts (see `get_stats`).
         """
         # Create primary key
         if key is not None:
@@ -293,15 +738,18 @@ TRAILING NULLCOLS
             # If the table is already read-only
             pass
 
-        # Gather optimizer statistics
-        self.execute("ANALYZE TABLE {} COMPUTE STATISTICS".format(table))
-
-        # Store checksum of contents as the table's comment
+        # Store checksum of contents as the table's comment; a string selects
+        # the checksum mode
         if checksum:
-            self.execute("COMMENT ON TABLE {} IS '{}'".format(table, self.get_checksum(table)))
+            mode = checksum if isinstance(checksum, str) else None
+            self.execute("COMMENT ON TABLE {} IS '{}'".format(table, self.get_checksum(table, mode)))
+
+        # Gather optimizer statistics last, since the SQLTable node only
+        # trusts statistics gathered after the table's last DDL
+        self.execute("ANALYZE TABLE {} COMPUTE STATISTICS".format(table))
 
         # Print and return stats
-        stats = self.get_stats(table)
+        stats = self.get_stats(table, quantiles=quantiles, distinct=distinct)
         print("=" * 100)
         print("Table:", table)
         print("Key:", key)
@@ -0,0 +1,171 @@
+"""
+Sparse design matrices assembled from blocks of columns, one block per
+feature file.
+
+Each block is a directory with a column-compressed (CSC) matrix for each
+subset, stored as raw little-endian arrays that numpy can memory-map and R can
+read with readBin:
+
+    columns.txt     column names, one per line
+    dims.csv        subset,nrow,ncol,nnz
+    {subset}.x      float64 values
+    {subset}.i      int32 row indices (0-based)
+    {subset}.p      int32 column pointers
+
+The subsets are named "train", "validate" and "test".
+"""
+
+import numpy as np
+import os
+import pandas as pd
+import scipy.sparse
+from riipl.sparse import DataFrameToSparse, IsSparse, ReadSparse
+
+SUBSETS = {"TRAINING": "train", "VALIDATION": "validate", "TESTING": "test"}
+
+BLOCK_FILES = ["columns.txt", "dims.csv"] + \
+              ["{}.{}".format(s, a) for s in SUBSETS.values() for a in "xip"]
+
+
+class DesignMatrix(object):
+    """
+    Builds design matrix blocks from feature files, checking that each file is
+    indexed the same way as the population in `outcomes_file` (a csv with the
+    index in the first column and a SUBSET column).
+    """
+
+    def __init__(self, outcomes_file, chunksize=100000):
+        self.outcomes = pd.read_csv(outcomes_file)
+        self.chunksize = chunksize
+        self.index = self.outcomes.iloc[:, 0].values
+        subset = self.outcomes["SUBSET"].values
+        self.subset = np.full(len(subset), -1)
+        self.position = np.zeros(len(subset), dtype=np.int64)
+        self.nrows = []
+        for k, s in enumerate(SUBSETS):
+            rows = np.flatnonzero(subset == s)
+            self.subset[rows] = k
+            self.position[rows] = np.arange(len(rows))
+            self.nrows.append(len(rows))
+
+
+    def outcomes_for(self, subset):
+        """
+        Return the outcomes for a subset ("train", "validate" or "test").
+        """
+        name = {v: k for k, v in SUBSETS.items()}[subset]
+        return self.outcomes[self.outcomes.SUBSET == name]
+
+
+    def build_block(self, feature_file, out_dir):
+        """
+        Convert a feature file (csv with the index in the first column, or a
+        sparse .npz/.mtx file in population order) into a block in `out_dir`.
+        Csv files are streamed in chunks of rows, so only the nonzero entries
+        are held in memory.
+        """
+        n = len(self.index)
+        parts = [([], [], []) for _ in SUBSETS]
+
+        def _add(rows, cols, data):
+            # Split global row numbers into per-subset row positions
+            subset = self.subset[rows]
+            for k, (r, c, d) in enumerate(parts):
+                keep = subset == k
+                r.append(self.position[rows[keep]])
+                c.append(cols[keep])
+                d.append(data[keep])
+
+        if IsSparse(feature_file):
+            matrix, columns = ReadSparse(feature_file)
+            if matrix.shape[0] != n:
+                raise ValueError("'{}' has {} rows, but the population has {}".format(
+                                 feature_file, matrix.shape[0], n))
+            coo = matrix.tocoo()
+            _add(coo.row, coo.col, coo.data)
+        else:
+            start = 0
+            columns = None
+            with pd.read_csv(feature_file, index_col=0, chunksize=self.chunksize) as chunks:
+                for chunk in chunks:
+                    stop = start + len(chunk)
+                    if not np.array_equal(chunk.index.values, self.index[start:stop]):
+                        raise ValueError("index of '{}' does not match population".format(feature_file))
+                    columns = list(chunk.columns)
+                    coo = DataFrameToSparse(chunk).tocoo()
+                    _add(coo.row + start, coo.col, coo.data)
+                    start = stop
+            if start != n:
+                raise ValueError("'{}' has {} rows, but the population has {}".format(feature_file, start, n))
+
+        matrices = {}
+        for k, s in enumerate(SUBSETS.values()):
+            r, c, d = (np.concatenate(a) if a else np.zeros(0) for a in parts[k])
+            matrices[s] = scipy.sparse.csc_matrix((d, (r, c)), shape=(self.nrows[k], len(columns)))
+        WriteBlock(out_dir, columns, matrices)
+        print("[riipl.design] block for {}: {} columns, {} nonzeros".format(
+              feature_file, len(columns), sum(m.nnz for m in matrices.values())))
+
+
+def WriteBlock(out_dir, columns, matrices):
+    """
+    Write a dict of CSC matrices, keyed by subset, as a block in `out_dir`.
+    """
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    with open(os.path.join(out_dir, "columns.txt"), "w") as f:
+        f.write("".join("{}\n".format(c) for c in columns))
+    with open(os.path.join(out_dir, "dims.csv"), "w") as f:
+        print("subset,nrow,ncol,nnz", file=f)
+        for s, m in matrices.items():
+            m = scipy.sparse.csc_matrix(m)
+            m.sum_duplicates()
+            m.sort_indices()
+            print("{},{},{},{}".format(s, m.shape[0], m.shape[1], m.nnz), file=f)
+            m.data.astype("<f8").tofile(os.path.join(out_dir, "{}.x".format(s)))
+            m.indices.astype("<i4").tofile(os.path.join(out_dir, "{}.i".format(s)))
+            m.indptr.astype("<i4").tofile(os.path.join(out_dir, "{}.p".format(s)))
+
+
+def ReadBlock(block_dir, subset):
+    """
+    Memory-map one subset of a block as a CSC matrix, returning the matrix
+    and its column names.
+    """
+    dims = pd.read_csv(os.path.join(block_dir, "dims.csv"), index_col="subset")
+    nrow, ncol, nnz = dims.loc[subset, ["nrow", "ncol", "nnz"]]
+    with open(os.path.join(block_dir, "columns.txt")) as f:
+        columns = f.read().splitlines()
+
+    def _map(name, dtype, length):
+        filename = os.path.join(block_dir, "{}.{}".format(subset, name))
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode="r", shape=(length,))
+
+    matrix = scipy.sparse.csc_matrix((_map("x", "<f8", nnz), _map("i", "<i4", nnz), _map("p", "<i4", ncol + 1)),
+                                     shape=(nrow, ncol), copy=False)
+    return matrix, columns
+
+
+def ReadDesignMatrix(block_dirs, subset):
+    """
+    Assemble the blocks for one subset into a single CSC matrix by
+    concatenating their arrays, returning the matrix and its column names.
+    """
+    blocks = [ReadBlock(d, subset) for d in block_dirs]
+    columns = [c for _, names in blocks for c in names]
+    if not blocks:
+        raise ValueError("no blocks to assemble")
+    nrow = blocks[0][0].shape[0]
+    for d, (m, _) in zip(block_dirs, blocks):
+        if m.shape[0] != nrow:
+            raise ValueError("block '{}' has {} rows, expected {}".format(d, m.shape[0], nrow))
+    data = np.concatenate([m.data for m, _ in blocks])
+    indices = np.concatenate([m.indices for m, _ in blocks])
+    offsets = np.cumsum([0] + [m.nnz for m, _ in blocks[:-1]])
+    indptr = np.concatenate([np.asarray(m.indptr[:-1], dtype=np.int64) + o for (m, _), o in zip(blocks, offsets)] +
+                            [[sum(m.nnz for m, _ in blocks)]])
+    return scipy.sparse.csc_matrix((data, indices, indptr), shape=(nrow, len(columns))), columns
+
+# vim: expandtab sw=4 ts=4
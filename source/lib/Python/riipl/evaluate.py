@@ -0,0 +1,196 @@
+"""
+Accuracy of binary predictions, accumulated over chunks of a scoring file.
+
+Predictions are reduced to counts of positive and negative outcomes per
+unique score, so every metric is computed from a single sort of the unique
+scores. Rows with tied scores are treated as interchangeable: when a quantile
+boundary falls inside a group of ties, the group's outcomes are split
+proportionally between the quantiles.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Accuracy(object):
+    """
+    Streaming accumulator for lift tables, ROC and precision-recall curves,
+    AUC, AUPRC, calibration and Brier score.
+    """
+
+    def __init__(self):
+        self.score = np.zeros(0)
+        self.pos = np.zeros(0)
+        self.neg = np.zeros(0)
+        self._pending = []
+
+
+    def update(self, y_true, y_score):
+        """
+        Add a chunk of 0/1 outcomes and predicted scores.
+        """
+        y_true = np.asarray(y_true, dtype=float)
+        y_score = np.asarray(y_score, dtype=float)
+        if len(y_true) != len(y_score):
+            raise ValueError("{} outcomes but {} scores".format(len(y_true), len(y_score)))
+        if np.isnan(y_score).any() or np.isnan(y_true).any():
+            raise ValueError("missing outcomes or scores")
+        score, group = np.unique(y_score, return_inverse=True)
+        group = group.ravel()
+        self._pending.append((score,
+                              np.bincount(group, y_true, minlength=len(score)),
+                              np.bincount(group, 1 - y_true, minlength=len(score))))
+        if len(self._pending) >= 16:
+            self._compact()
+        return self
+
+
+    def _compact(self):
+        """
+        Merge the pending chunks into the per-score counts, sorted by
+        descending score.
+        """
+        if not self._pending:
+            return
+        parts = [(self.score, self.pos, self.neg)] + self._pending
+        self._pending = []
+        score, group = np.unique(np.concatenate([p[0] for p in parts]), return_inverse=True)
+        group = group.ravel()
+        n = len(score)
+        pos = np.bincount(group, np.concatenate([p[1] for p in parts]), minlength=n)
+        neg = np.bincount(group, np.concatenate([p[2] for p in parts]), minlength=n)
+        self.score, self.pos, self.neg = score[::-1], pos[::-1], neg[::-1]
+
+
+    def _counts(self):
+        self._compact()
+        return self.score, self.pos, self.neg
+
+
+    @property
+    def n(self):
+        _, pos, neg = self._counts()
+        return pos.sum() + neg.sum()
+
+
+    def lift(self, q=10):
+        """
+        Return the lift table for `q` quantiles of descending score, with the
+        size and number of outcomes in each quantile. Quantile sizes differ by
+        at most one row, so no rows are dropped.
+        """
+        score, pos, neg = self._counts()
+        n = self.n
+        bounds = np.round(np.arange(q + 1) * n / q)
+        outcomes = np.diff(self._cumulative(bounds, pos))
+        size = np.diff(bounds)
+        rate = pos.sum() / n if n else np.nan
+        with np.errstate(invalid="ignore", divide="ignore"):
+            lift = outcomes / size / rate
+        return pd.DataFrame({"decile": np.arange(1, q + 1),
+                             "size": size.astype(int),
+                             "outcomes": outcomes,
+                             "lift": lift})
+
+
+    def calibration(self, q=10):
+        """
+        Return the mean predicted score and observed outcome rate in `q`
+        quantiles of descending score.
+        """
+        score, pos, neg = self._counts()
+        bounds = np.round(np.arange(q + 1) * self.n / q)
+        size = np.diff(bounds)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            predicted = np.diff(self._cumulative(bounds, score * (pos + neg))) / size
+            observed = np.diff(self._cumulative(bounds, pos)) / size
+        return pd.DataFrame({"bin": np.arange(1, q + 1),
+                             "size": size.astype(int),
+                             "predicted": predicted,
+                             "observed": observed})
+
+
+    def _cumulative(self, bounds, values):
+        """
+        Interpolate the cumulative sum of per-score `values` at row counts
+        `bounds`, spreading each group of tied scores evenly over its rows.
+        """
+        _, pos, neg = self._counts()
+        rows = np.concatenate([[0], np.cumsum(pos + neg)])
+        return np.interp(bounds, rows, np.concatenate([[0], np.cumsum(values)]))
+
+
+    def roc_curve(self):
+        """
+        Return the ROC curve as (fpr, tpr, threshold) arrays, with one point
+        per unique score.
+        """
+        score, pos, neg = self._counts()
+        tpr = np.concatenate([[0], np.cumsum(pos)]) / pos.sum()
+        fpr = np.concatenate([[0], np.cumsum(neg)]) / neg.sum()
+        return fpr, tpr, np.concatenate([[np.inf], score])
+
+
+    def pr_curve(self):
+        """
+        Return the precision-recall curve as (recall, precision, threshold)
+        arrays, with one point per unique score.
+        """
+        score, pos, neg = self._counts()
+        tp = np.cumsum(pos)
+        fp = np.cumsum(neg)
+        return tp / pos.sum(), tp / (tp + fp), score
+
+
+    def auc(self):
+        """
+        Area under the ROC curve, counting ties as half.
+        """
+        _, pos, neg = self._counts()
+        # Positives outrank the negatives in lower-scored groups, and tie half of their own group
+        below = neg.sum() - np.cumsum(neg)
+        return np.dot(pos, below + 0.5 * neg) / (pos.sum() * neg.sum())
+
+
+    def auprc(self):
+        """
+        Area under the precision-recall curve, interpolating precision between
+        unique scores as in Davis and Goadrich (2006), the same integral as
+        PRROC's pr.curve.
+        """
+        _, pos, neg = self._counts()
+        tp = np.concatenate([[0], np.cumsum(pos)])
+        fp = np.concatenate([[0], np.cumsum(neg)])
+        h = np.diff(tp)
+        a = tp[:-1]
+        b = tp[:-1] + fp[:-1]
+        keep = h > 0
+        h, a, b = h[keep], a[keep], b[keep]
+        # Precision along a segment is (a + x) / (b + c x) for x true positives
+        c = 1 + np.diff(fp)[keep] / h
+        with np.errstate(invalid="ignore", divide="ignore"):
+            log = np.where(b > 0, np.log((b + c * h) / np.where(b > 0, b, 1)), 0.0)
+        area = h / c + (a - b / c) / c * log
+        return area.sum() / tp[-1]
+
+
+    def brier(self):
+        """
+        Mean squared difference between the scores and outcomes.
+        """
+        score, pos, neg = self._counts()
+        return (np.dot(pos, (1 - score) ** 2) + np.dot(neg, score ** 2)) / self.n
+
+
+    def summary(self):
+        """
+        Return the scalar metrics as a one-row dataframe.
+        """
+        _, pos, _ = self._counts()
+        return pd.DataFrame({"n": [int(self.n)],
+                             "outcomes": [int(round(pos.sum()))],
+                             "auc": [self.auc()],
+                             "auprc": [self.auprc()],
+                             "brier": [self.brier()]})
+
+# vim: expandtab sw=4 ts=4
@@ -0,0 +1,140 @@
+"""
+Readers and writers for RIIPL column-store formatted HDF5 files, which hold
+one 1-D dataset per column, all of the same length.
+"""
+
+import h5py
+import numpy as np
+import pandas as pd
+
+
+def ReadHDF5(filename, usecols=None, index_col=None, rows=None, population=None):
+    """
+    Read a RIIPL column-store formatted HDF5 file into a pandas dataframe.
+
+    Only the rows in `rows` (a slice or an array of row numbers) are read, or
+    only those whose `index_col` values are in `population` (an Index, a
+    dataframe indexed by `index_col`, or an array of values). Uncompressed,
+    contiguous columns are memory-mapped instead of copied when reading all
+    rows or a slice.
+    """
+    with h5py.File(filename, "r") as f:
+        datasets = _check_datasets(f, usecols, index_col)
+        if population is not None:
+            if index_col is None:
+                raise ValueError("index_col is required to select a population")
+            rows = _population_rows(f, index_col, population)
+        data = {d: _read(f, filename, d, rows) for d in datasets}
+    df = pd.DataFrame(data, columns=datasets, copy=False)
+    if index_col is not None:
+        return df.set_index(index_col)
+    else:
+        return df
+
+
+def IterHDF5(filename, chunksize=100000, usecols=None, index_col=None):
+    """
+    Iterate over a RIIPL column-store formatted HDF5 file in dataframes of at
+    most `chunksize` rows.
+    """
+    with h5py.File(filename, "r") as f:
+        datasets = _check_datasets(f, usecols, index_col)
+        n = len(f[datasets[0]])
+        for start in range(0, n, chunksize):
+            rows = slice(start, min(start + chunksize, n))
+            df = pd.DataFrame({d: _read(f, filename, d, rows) for d in datasets}, columns=datasets, copy=False)
+            df.index = pd.RangeIndex(rows.start, rows.stop)
+            yield df.set_index(index_col) if index_col is not None else df
+
+
+def WriteHDF5(df, filename, index=True, chunks=None, compression=None, compression_opts=None):
+    """
+    Write a dataframe to a RIIPL column-store formatted HDF5 file, including
+    its named index levels as columns if `index` is True.
+
+    By default columns are stored contiguously and uncompressed, so that they
+    can be memory-mapped by ReadHDF5. Pass `chunks` (rows per chunk) and a
+    `compression` filter such as "gzip" or "lzf" to trade read speed for size.
+    Strings are stored as fixed-length UTF-8 bytes, and datetimes as int64
+    nanoseconds.
+    """
+    if index and any(name is not None for name in df.index.names):
+        df = df.reset_index()
+    with h5py.File(filename, "w") as f:
+        for col in df.columns:
+            values = df[col].values
+            attrs = {}
+            if values.dtype.kind == "M":
+                attrs["dtype"] = str(values.dtype)
+                values = values.view("i8")
+            elif not pd.api.types.is_numeric_dtype(df[col]):
+                values = np.char.encode(np.asarray(df[col].astype(str), dtype=str), "utf-8")
+            kwargs = {}
+            if compression is not None or chunks is not None:
+                kwargs["chunks"] = (min(int(chunks), len(values)),) if chunks and len(values) else True
+                kwargs["compression"] = compression
+                kwargs["compression_opts"] = compression_opts
+            dset = f.create_dataset(str(col), data=values, **kwargs)
+            for k, v in attrs.items():
+                dset.attrs[k] = v
+
+
+def _check_datasets(f, usecols, index_col):
+    """
+    Return the datasets to read, and check that they have the same length.
+    """
+    datasets = list(f.keys())
+    if usecols is not None:
+        for col in usecols: assert col in datasets
+        datasets = list(usecols)
+        if index_col is not None:
+            for col in ([index_col] if isinstance(index_col, str) else index_col):
+                if col not in datasets:
+                    datasets.insert(0, col)
+    n = len(f[datasets[0]])
+    for d in datasets[1:]:
+        assert n == len(f[d])
+    return datasets
+
+
+def _population_rows(f, index_col, population):
+    """
+    Find the row numbers whose index values are in the population.
+    """
+    if isinstance(population, pd.DataFrame):
+        population = population.index
+    if isinstance(index_col, str):
+        index = pd.Index(_read(f, None, index_col, None))
+    else:
+        index = pd.MultiIndex.from_arrays([_read(f, None, c, None) for c in index_col])
+    return np.flatnonzero(index.isin(population))
+
+
+def _read(f, filename, name, rows):
+    """
+    Read the given rows of a dataset, memory-mapping it when possible.
+    """
+    dset = f[name]
+    offset = dset.id.get_offset()
+    if filename is not None and (rows is None or isinstance(rows, slice)) and \
+       dset.chunks is None and dset.compression is None and offset is not None and \
+       dset.dtype.kind != "O":
+        values = np.memmap(filename, dtype=dset.dtype, mode="r", offset=offset, shape=dset.shape)
+        values = values[rows] if rows is not None else values
+    elif rows is None:
+        values = dset[()]
+    elif isinstance(rows, slice):
+        values = dset[rows]
+    else:
+        rows = np.asarray(rows)
+        if len(rows) == 0:
+            values = dset[0:0]
+        else:
+            # Read the covering range once, instead of one point at a time
+            lo, hi = rows.min(), rows.max() + 1
+            values = dset[lo:hi][rows - lo]
+    if "dtype" in dset.attrs:
+        values = np.asarray(values).view(dset.attrs["dtype"])
+    return values
+
+# vim: expandtab sw=4 ts=4
@@ -0,0 +1,330 @@
+"""
+Normalization of feature files using parameters fitted on the training subset.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from riipl.sparse import IsSparse, SaveSparse
+
+
+class Normalizer(object):
+    """
+    Normalizes features with parameters fitted on the training subset:
+
+      * variables with a single value (or only missing values) in the training
+        subset are dropped
+      * categorical variables are expanded into 0/1 dummies for each value
+        observed in the training subset, except the most frequent one
+      * numeric variables that are 0/1 everywhere are kept as integers
+      * other numeric variables are standardized with the training mean and
+        standard deviation, and missing values are filled with 0 and flagged
+        in a NAME_MISSING dummy
+
+    The fit is computed in a single pass over row chunks, and the fitted
+    parameters can be saved and reloaded to transform new data without
+    refitting.
+    """
+
+    def __init__(self, protected=()):
+        self.protected = frozenset(protected)
+        self.params = None
+
+
+    def fit(self, x, train):
+        """
+        Fit the parameters on dataframe `x`, where `train` is a boolean mask of
+        the rows in the training subset.
+        """
+        fit = _Fit()
+        fit.update(x, np.asarray(train, dtype=bool))
+        self.params = fit.finalize(self.protected)
+        return self
+
+
+    def fit_csv(self, filename, train, index_col, chunksize=100000):
+        """
+        Fit the parameters on a csv file, read in chunks of `chunksize` rows.
+        The `train` mask must be a boolean series indexed like the population,
+        and the file's index must match it.
+        """
+        fit = _Fit()
+        start = 0
+        with pd.read_csv(filename, index_col=index_col, chunksize=chunksize) as chunks:
+            for chunk in chunks:
+                stop = start + len(chunk)
+                if not chunk.index.equals(train.index[start:stop]):
+                    raise ValueError("index of '{}' does not match the population".format(filename))
+                fit.update(chunk, train.values[start:stop])
+                start = stop
+        if start != len(train):
+            raise ValueError("'{}' has {} rows, but the population has {}".format(filename, start, len(train)))
+        self.params = fit.finalize(self.protected)
+        return self
+
+
+    def transform(self, x):
+        """
+        Return the normalized features for dataframe `x`.
+        """
+        if self.params is None:
+            raise ValueError("Normalizer has not been fitted")
+        n = len(x)
+        columns = {}
+        for p in self.params:
+            name = p["name"]
+            if p["type"] == "categorical":
+                codes = pd.Index(p["levels"], dtype=object).get_indexer(x[name].astype(object))
+                dummies = np.zeros((n, len(p["levels"])), dtype=int)
+                rows = np.flatnonzero(codes >= 0)
+                dummies[rows, codes[rows]] = 1
+                for i, level in enumerate(p["levels"]):
+                    columns[_dummy_name(name, level)] = dummies[:, i]
+            elif p["type"] == "binary":
+                columns[name] = x[name].values.astype(int)
+            else:
+                values = (x[name].values.astype(float) - p["mean"]) / p["std"]
+                if p["missing"]:
+                    missing = np.isnan(values)
+                    columns[name] = np.where(missing, 0.0, values)
+                    columns[name + "_MISSING"] = missing.astype(int)
+                else:
+                    columns[name] = values
+        return pd.DataFrame(columns, index=x.index)
+
+
+    def transform_sparse(self, x):
+        """
+        Return the normalized features for dataframe `x` as a CSR matrix, built
+        directly from the nonzero entries of each output column.
+        """
+        if self.params is None:
+            raise ValueError("Normalizer has not been fitted")
+        rows, cols, data = [], [], []
+
+        def _add(j, r, d):
+            rows.append(r)
+            cols.append(np.full(len(r), j))
+            data.append(d)
+
+        j = 0
+        for p in self.params:
+            name = p["name"]
+            if p["type"] == "categorical":
+                codes = pd.Index(p["levels"], dtype=object).get_indexer(x[name].astype(object))
+                r = np.flatnonzero(codes >= 0)
+                _add(j + codes[r], r, np.ones(len(r)))
+                j += len(p["levels"])
+            elif p["type"] == "binary":
+                r = np.flatnonzero(x[name].values)
+                _add(j, r, np.ones(len(r)))
+                j += 1
+            else:
+                values = (x[name].values.astype(float) - p["mean"]) / p["std"]
+                missing = np.isnan(values)
+                r = np.flatnonzero(~missing & (values != 0))
+                _add(j, r, values[r])
+                j += 1
+                if p["missing"]:
+                    r = np.flatnonzero(missing)
+                    _add(j, r, np.ones(len(r)))
+                    j += 1
+
+        shape = (len(x), j)
+        if not rows:
+            return scipy.sparse.csr_matrix(shape)
+        return scipy.sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                       shape=shape)
+
+
+    def output_columns(self):
+        """
+        Return the names of the normalized features, in order.
+        """
+        columns = []
+        for p in self.params:
+            if p["type"] == "categorical":
+                columns.extend(_dummy_name(p["name"], level) for level in p["levels"])
+            else:
+                columns.append(p["name"])
+                if p["type"] == "scaled" and p["missing"]:
+                    columns.append(p["name"] + "_MISSING")
+        return columns
+
+
+    def transform_csv(self, filename, out, index_col, chunksize=100000):
+        """
+        Normalize a csv file in chunks of `chunksize` rows, writing the result
+        to `out`. If `out` is a sparse feature file (.npz or .mtx), the chunks
+        are converted directly to a sparse matrix; otherwise they are appended
+        to a csv file.
+        """
+        sparse = IsSparse(out)
+        blocks = []
+        header = True
+        with pd.read_csv(filename, index_col=index_col, chunksize=chunksize) as chunks:
+            for chunk in chunks:
+                if sparse:
+                    blocks.append(self.transform_sparse(chunk))
+                else:
+                    self.transform(chunk).to_csv(out, mode="w" if header else "a", header=header)
+                header = False
+        if sparse:
+            matrix = scipy.sparse.vstack(blocks, format="csr") if blocks else \
+                     scipy.sparse.csr_matrix((0, len(self.output_columns())))
+            SaveSparse(matrix, self.output_columns(), out)
+
+
+    def save(self, filename):
+        """
+        Save the fitted parameters as json.
+        """
+        with open(filename, "w") as f:
+            json.dump({"protected": sorted(self.protected), "params": self.params}, f, indent=1)
+
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load a Normalizer with previously fitted parameters.
+        """
+        with open(filename) as f:
+            saved = json.load(f)
+        normalizer = cls(saved["protected"])
+        normalizer.params = saved["params"]
+        return normalizer
+
+
+def _dummy_name(name, value):
+    return "{}_{}".format(name, str(value).upper().replace(" ", "_"))
+
+
+class _Fit(object):
+    """
+    Accumulates the statistics needed to fit a Normalizer over row chunks.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.numeric = None
+        self.categorical = None
+
+    def update(self, x, train):
+        if self.columns is None:
+            self.columns = list(x.columns)
+            self.numeric = [c for c in x.columns if pd.api.types.is_numeric_dtype(x[c])]
+            self.categorical = [c for c in x.columns if c not in self.numeric]
+            k = len(self.numeric)
+            self.n = np.zeros(k)
+            self.mean = np.zeros(k)
+            self.m2 = np.zeros(k)
+            self.min = np.full(k, np.inf)
+            self.max = np.full(k, -np.inf)
+            self.train_null = np.zeros(k, dtype=bool)
+            self.null = np.zeros(k, dtype=bool)
+            self.seen = np.zeros(k, dtype=bool)
+            self.binary = np.ones(k, dtype=bool)
+            self.counts = {c: {} for c in self.categorical}
+            self.cat_train_null = {c: False for c in self.categorical}
+        elif list(x.columns) != self.columns:
+            raise ValueError("columns changed between chunks")
+
+        for c in list(self.numeric):
+            if not pd.api.types.is_numeric_dtype(x[c]) and x[c].notnull().any():
+                i = self.numeric.index(c)
+                if self.seen[i]:
+                    raise ValueError("numeric variable '{}' has non-numeric values".format(c))
+                # A column that has only been null so far was read as float,
+                # and is really categorical
+                self._reclassify(i)
+
+        # Numeric statistics for all columns at once
+        values = x[self.numeric].to_numpy(dtype=float)
+        isnull = np.isnan(values)
+        self.null |= isnull.any(axis=0)
+        self.seen |= ~isnull.all(axis=0)
+        self.binary &= ((values == 0) | (values == 1)).all(axis=0)
+        t = values[train]
+        tnull = isnull[train]
+        self.train_null |= tnull.any(axis=0)
+        n = (~tnull).sum(axis=0)
+        has = n > 0
+        total = np.where(tnull, 0.0, t).sum(axis=0)
+        mean = np.divide(total, n, out=np.zeros_like(total), where=has)
+        m2 = np.where(tnull, 0.0, (t - mean) ** 2).sum(axis=0)
+        self.min = np.where(has, np.fmin(self.min, np.where(tnull, np.inf, t).min(axis=0, initial=np.inf)), self.min)
+        self.max = np.where(has, np.fmax(self.max, np.where(tnull, -np.inf, t).max(axis=0, initial=-np.inf)), self.max)
+        # Combine with the previous chunks (Chan et al.)
+        combined = self.n + n
+        delta = mean - self.mean
+        safe = np.where(combined > 0, combined, 1)
+        self.mean = self.mean + delta * n / safe
+        self.m2 = self.m2 + m2 + delta ** 2 * self.n * n / safe
+        self.n = combined
+
+        # Value counts for categorical columns
+        for c in self.categorical:
+            values = x.loc[train, c]
+            self.cat_train_null[c] |= bool(values.isnull().any())
+            counts = self.counts[c]
+            for value, count in values.value_counts(sort=False).items():
+                counts[value] = counts.get(value, 0) + count
+
+    def _reclassify(self, i):
+        """
+        Move the i-th numeric column, which has no values yet, to the
+        categorical columns.
+        """
+        c = self.numeric.pop(i)
+        self.categorical.append(c)
+        self.counts[c] = {}
+        self.cat_train_null[c] = bool(self.train_null[i])
+        for name in ("n", "mean", "m2", "min", "max", "train_null", "null", "seen", "binary"):
+            setattr(self, name, np.delete(getattr(self, name), i))
+
+    def finalize(self, protected):
+        params = []
+        numeric = {c: i for i, c in enumerate(self.numeric)}
+        for name in self.columns:
+
+            # Protected names
+            assert name not in protected
+
+            if name in numeric:
+                i = numeric[name]
+                nunique = (0 if self.n[i] == 0 else (1 if self.min[i] == self.max[i] else 2)) + \
+                          int(self.train_null[i])
+            else:
+                nunique = len(self.counts[name]) + int(self.cat_train_null[name])
+
+            # Drop empty variables
+            if nunique == 1:
+                print("dropping empty variable '{}'".format(name))
+                continue
+
+            if name not in numeric:
+                # Dummies for values observed in training data, except the most frequent,
+                # to avoid collinearity
+                counts = sorted(self.counts[name].items(), key=lambda x: -x[1])
+                params.append({"name": name,
+                               "type": "categorical",
+                               "levels": [value for value, _ in counts[1:]]})
+            elif self.binary[i]:
+                # Don't scale dummy variables
+                params.append({"name": name, "type": "binary"})
+            else:
+                std = np.sqrt(self.m2[i] / (self.n[i] - 1)) if self.n[i] > 1 else np.nan
+                if not std > 0:
+                    print("warning: dropping {} with 0 stdev".format(name))
+                    continue
+                if self.null[i]:
+                    print("Filling missing", name, "with mean value")
+                params.append({"name": name,
+                               "type": "scaled",
+                               "mean": float(self.mean[i]),
+                               "std": float(std),
+                               "missing": bool(self.null[i])})
+        return params
+
+# vim: expandtab sw=4 ts=4
@@ -0,0 +1,123 @@
+"""
+Shared pools of Oracle sessions.
+
+This module only depends on the standard library and cx_Oracle, so that it can
+also be loaded by the SCons extensions in `source/lib/SCons`.
+"""
+
+import contextlib
+import cx_Oracle
+import os
+import threading
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+class SessionPool(object):
+    """
+    A pool of externally authenticated ("/") Oracle sessions.
+
+    Sessions are created `increment` at a time, between `min` and `max`, and
+    each keeps a client-side cache of `stmtcachesize` prepared statements.
+    With `drcp=True`, sessions are requested from a database resident
+    connection pool with connection class `cclass`; the `dsn` must then refer
+    to a pooled server (e.g. "host/service:pooled").
+
+    The `driver` is the DB API module providing `SessionPool`, and defaults to
+    cx_Oracle.
+    """
+
+    def __init__(self, min=1, max=8, increment=1, stmtcachesize=50,
+                 dsn=None, drcp=False, cclass="RIIPL", driver=None):
+        self.driver = driver or cx_Oracle
+        self.drcp = drcp
+        self.cclass = cclass
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._acquires = 0
+        self._releases = 0
+        self._pool = self.driver.SessionPool(externalauth=True,
+                                             homogeneous=False,
+                                             dsn=dsn or "",
+                                             min=min,
+                                             max=max,
+                                             increment=increment,
+                                             threaded=True,
+                                             getmode=self.driver.SPOOL_ATTRVAL_WAIT)
+        self._pool.stmtcachesize = stmtcachesize
+
+
+    def acquire(self):
+        """
+        Return a session from the pool, waiting if all `max` sessions are busy.
+        """
+        if self.drcp:
+            cxn = self._pool.acquire(cclass=self.cclass, purity=self.driver.ATTR_PURITY_SELF)
+        else:
+            cxn = self._pool.acquire()
+        with self._lock:
+            self._acquires += 1
+        return cxn
+
+
+    def release(self, cxn):
+        """
+        Return a session to the pool, rolling back any open transaction.
+        """
+        self._pool.release(cxn)
+        with self._lock:
+            self._releases += 1
+
+
+    @contextlib.contextmanager
+    def session(self):
+        """
+        Context manager that acquires a session and always releases it.
+        """
+        cxn = self.acquire()
+        try:
+            yield cxn
+        finally:
+            self.release(cxn)
+
+
+    def stats(self):
+        """
+        Return a dict with the pool's configuration and usage counters.
+        """
+        with self._lock:
+            return {"min": self._pool.min,
+                    "max": self._pool.max,
+                    "increment": self._pool.increment,
+                    "opened": self._pool.opened,
+                    "busy": self._pool.busy,
+                    "stmtcachesize": self._pool.stmtcachesize,
+                    "drcp": self.drcp,
+                    "acquires": self._acquires,
+                    "releases": self._releases}
+
+
+    def close(self):
+        """
+        Close the pool and all of its sessions.
+        """
+        self._pool.close(force=True)
+
+
+def get_pool():
+    """
+    Return the process-wide session pool, creating it on first use (or after
+    a fork). It is configured by the environment variables RIIPL_POOL_MIN,
+    RIIPL_POOL_MAX, RIIPL_POOL_DRCP and RIIPL_POOL_DSN.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None or _default_pool.pid != os.getpid():
+            _default_pool = SessionPool(min=int(os.environ.get("RIIPL_POOL_MIN", 1)),
+                                        max=int(os.environ.get("RIIPL_POOL_MAX", 8)),
+                                        dsn=os.environ.get("RIIPL_POOL_DSN"),
+                                        drcp=os.environ.get("RIIPL_POOL_DRCP", "") == "1")
+        return _default_pool
+
+# vim: expandtab sw=4 ts=4
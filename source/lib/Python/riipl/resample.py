@@ -0,0 +1,142 @@
+"""
+Bootstrap confidence intervals, evaluated in blocks of replicates over a
+process pool.
+
+Replicate i is always drawn from np.random.RandomState(seed + i), so results
+do not depend on the block size or number of processes, and match the
+resamples drawn by `data.sample(n=len(data), replace=True, random_state=seed+i)`.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+STATISTICS = ("mean", "auc", "lift")
+
+_state = {}
+
+
+def bootstrap(data, N, statistic, seed, processes=1, block_size=50, alpha=0.05,
+              weights="multinomial", columns=("y_test", "y_pred")):
+    """
+    Return the statistic on `data` and its bootstrap confidence interval, as a
+    (estimate, lower, upper) tuple.
+
+    `statistic` is either a function of a resampled dataframe (or array), or
+    the name of a fast statistic that is computed from resampling weights
+    without materializing the resampled data:
+
+      * "mean" of a series or array
+      * "auc", the area under the ROC curve
+      * "lift", the outcome rate in the top decile of predictions relative to
+        the overall rate
+
+    "auc" and "lift" read the outcome and prediction from the `columns` of a
+    dataframe. Replicates are evaluated in blocks of `block_size` over
+    `processes` worker processes. With `weights="poisson"`, each observation
+    is drawn a Poisson(1) number of times instead of resampling exactly
+    len(data) observations.
+    """
+    stats = bootstrap_replicates(data, N, statistic, seed, processes, block_size, weights, columns)
+    stats = np.sort(stats)
+    if isinstance(statistic, str):
+        estimate = _fast(_prepare(data, statistic, columns), statistic, np.ones(len(data)))
+    else:
+        estimate = statistic(data)
+    return estimate, stats[int(alpha / 2 * N)], stats[int((1 - alpha / 2) * N)]
+
+
+def bootstrap_replicates(data, N, statistic, seed, processes=1, block_size=50,
+                         weights="multinomial", columns=("y_test", "y_pred")):
+    """
+    Return an array with the statistic on each of `N` bootstrap replicates,
+    in replicate order.
+    """
+    if isinstance(statistic, str) and statistic not in STATISTICS:
+        raise ValueError("unknown statistic '{}', expected one of {}".format(statistic, STATISTICS))
+    if weights not in ("multinomial", "poisson"):
+        raise ValueError("unknown weights '{}'".format(weights))
+    prepared = _prepare(data, statistic, columns) if isinstance(statistic, str) else data
+    blocks = [(start, min(start + block_size, N)) for start in range(0, N, block_size)]
+    args = (prepared, statistic, seed, weights)
+    if processes > 1 and len(blocks) > 1:
+        # Workers receive the data once, when they are started
+        with ProcessPoolExecutor(processes, initializer=_init, initargs=args) as pool:
+            results = list(pool.map(_block, blocks))
+    else:
+        _init(*args)
+        try:
+            results = [_block(b) for b in blocks]
+        finally:
+            _state.clear()
+    return np.concatenate(results) if results else np.zeros(0)
+
+
+def _init(data, statistic, seed, weights):
+    _state.update(data=data, statistic=statistic, seed=seed, weights=weights)
+
+
+def _block(bounds):
+    """
+    Evaluate the statistic on replicates start to stop.
+    """
+    data, statistic, seed, weights = (_state[k] for k in ("data", "statistic", "seed", "weights"))
+    n = len(data["order"]) if isinstance(statistic, str) else len(data)
+    stats = np.empty(bounds[1] - bounds[0])
+    for k, i in enumerate(range(*bounds)):
+        random = np.random.RandomState(seed + i)
+        if weights == "poisson":
+            w = random.poisson(1.0, n).astype(float)
+            idx = None
+        else:
+            idx = random.choice(n, size=n, replace=True)
+            w = None
+        if isinstance(statistic, str):
+            if w is None:
+                w = np.bincount(idx, minlength=n).astype(float)
+            stats[k] = _fast(data, statistic, w)
+        else:
+            if idx is None:
+                idx = np.repeat(np.arange(n), w.astype(int))
+            stats[k] = statistic(data.take(idx) if isinstance(data, (pd.DataFrame, pd.Series)) else
+                                 np.asarray(data)[idx])
+    return stats
+
+
+def _prepare(data, statistic, columns):
+    """
+    Precompute the sort orders and score groups used by the fast statistics.
+    """
+    if statistic == "mean":
+        x = np.asarray(data, dtype=float)
+        return {"x": x, "order": np.arange(len(x))}
+    y = np.asarray(data[columns[0]], dtype=float)
+    score = np.asarray(data[columns[1]], dtype=float)
+    order = np.argsort(-score, kind="mergesort")
+    # Groups of tied scores, in descending order of score
+    _, group = np.unique(-score, return_inverse=True)
+    return {"y": y, "order": order, "group": group.ravel(), "ngroups": group.max() + 1 if len(group) else 0}
+
+
+def _fast(data, statistic, w):
+    """
+    Compute a fast statistic with observation weights `w`.
+    """
+    if statistic == "mean":
+        return np.dot(w, data["x"]) / w.sum()
+    y = data["y"]
+    if statistic == "auc":
+        pos = np.bincount(data["group"], w * y, minlength=data["ngroups"])
+        neg = np.bincount(data["group"], w * (1 - y), minlength=data["ngroups"])
+        # Positives outrank the negatives in lower-scored groups, and tie half of their own group
+        below = neg.sum() - np.cumsum(neg)
+        return np.dot(pos, below + 0.5 * neg) / (pos.sum() * neg.sum())
+    else:
+        total = w.sum()
+        ws = w[data["order"]]
+        cw = np.cumsum(ws)
+        # Fraction of each observation's weight inside the top decile
+        top = np.clip(total / 10 - (cw - ws), 0, ws)
+        return (np.dot(top, y[data["order"]]) / top.sum()) / (np.dot(w, y) / total)
+
+# vim: expandtab sw=4 ts=4
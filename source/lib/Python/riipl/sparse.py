@@ -0,0 +1,72 @@
+"""
+Sparse feature files: a scipy .npz or Matrix Market .mtx matrix, with the
+column names stored one per line in a ".columns" manifest next to it. Rows are
+in population order.
+"""
+
+import numpy as np
+import scipy.io
+import scipy.sparse
+
+SPARSE_EXTENSIONS = (".npz", ".mtx")
+
+
+def IsSparse(filename):
+    """
+    Whether a feature file name refers to a sparse feature file.
+    """
+    return str(filename).endswith(SPARSE_EXTENSIONS)
+
+
+def SaveSparse(matrix, columns, out):
+    """
+    Save a sparse matrix and its column names. The format is chosen by the
+    extension of `out`: ".npz" for Python, or ".mtx" for Matrix Market, which
+    can also be read in R with Matrix::readMM.
+    """
+    columns = list(columns)
+    if matrix.shape[1] != len(columns):
+        raise ValueError("matrix has {} columns, but {} names".format(matrix.shape[1], len(columns)))
+    if out.endswith(".npz"):
+        scipy.sparse.save_npz(out, scipy.sparse.csr_matrix(matrix))
+    elif out.endswith(".mtx"):
+        scipy.io.mmwrite(out, scipy.sparse.coo_matrix(matrix), precision=15)
+    else:
+        raise ValueError("unknown sparse format for '{}'".format(out))
+    with open(out + ".columns", "w") as f:
+        f.write("\n".join(map(str, columns)) + "\n")
+
+
+def ReadSparse(filename):
+    """
+    Read a sparse feature file as a (CSR matrix, column names) tuple.
+    """
+    if filename.endswith(".npz"):
+        matrix = scipy.sparse.load_npz(filename)
+    elif filename.endswith(".mtx"):
+        matrix = scipy.io.mmread(filename)
+    else:
+        raise ValueError("unknown sparse format for '{}'".format(filename))
+    with open(filename + ".columns") as f:
+        columns = f.read().splitlines()
+    return scipy.sparse.csr_matrix(matrix), columns
+
+
+def DataFrameToSparse(df):
+    """
+    Convert a numeric dataframe to a CSR matrix one column at a time, without
+    building a dense copy of the whole frame. Missing values are kept as NaN.
+    """
+    rows, cols, data = [], [], []
+    for j, name in enumerate(df.columns):
+        values = df[name].to_numpy(dtype=float)
+        nz = np.flatnonzero(values != 0)
+        rows.append(nz)
+        cols.append(np.full(len(nz), j))
+        data.append(values[nz])
+    if not rows:
+        return scipy.sparse.csr_matrix(df.shape)
+    return scipy.sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                   shape=df.shape)
+
+# vim: expandtab sw=4 ts=4
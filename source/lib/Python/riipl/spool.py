@@ -0,0 +1,144 @@
+"""
+Writers for spooling query results to csv and columnar files.
+"""
+
+import csv
+import cx_Oracle
+import gzip
+import io
+import queue
+import threading
+
+FORMATS = {".csv": "csv",
+           ".csv.gz": "csv.gz",
+           ".csv.zst": "csv.zst",
+           ".parquet": "parquet",
+           ".feather": "feather"}
+
+
+def infer_format(path):
+    """
+    Infer the output format from the file extension.
+    """
+    for ext in sorted(FORMATS, key=len, reverse=True):
+        if path.endswith(ext):
+            return FORMATS[ext]
+    raise ValueError("cannot infer output format for '{}'".format(path))
+
+
+def open_writer(path, description, header=True, format=None):
+    """
+    Return a writer for rows with the given cursor description.
+    """
+    format = format or infer_format(path)
+    if format in ("csv", "csv.gz", "csv.zst"):
+        return CSVWriter(path, description, header, format)
+    elif format in ("parquet", "feather"):
+        return ArrowWriter(path, description, format)
+    else:
+        raise ValueError("unknown output format '{}'".format(format))
+
+
+class CSVWriter(object):
+    """
+    Write rows to a plain, gzip or zstd compressed csv file.
+    """
+
+    def __init__(self, path, description, header=True, format="csv"):
+        if format == "csv.gz":
+            self.f = gzip.open(path, "wt", newline="", compresslevel=4)
+        elif format == "csv.zst":
+            import zstandard
+            stream = zstandard.ZstdCompressor(threads=-1).stream_writer(open(path, "wb"))
+            self.f = io.TextIOWrapper(stream, newline="")
+        else:
+            self.f = open(path, "w", newline="")
+        self.writer = csv.writer(self.f)
+        if header:
+            self.writer.writerow([column[0] for column in description])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+
+class ArrowWriter(object):
+    """
+    Write rows to a Parquet or Feather (Arrow IPC) file, with the column types
+    taken from the cursor description.
+    """
+
+    def __init__(self, path, description, format="parquet"):
+        import pyarrow
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([(d[0], _arrow_type(pyarrow, d)) for d in description])
+        if format == "parquet":
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            import pyarrow.ipc
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        arrays = [self.pa.array(col, type=field.type) for col, field in zip(columns, self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _arrow_type(pa, description):
+    """
+    Map an Oracle column description to an Arrow type.
+    """
+    _, dbtype, _, _, precision, scale, _ = description
+    # cx_Oracle 8 reports DbType objects, which compare equal (but are not
+    # identical) to the older type constants, and binary floats also compare
+    # equal to NUMBER, so they are checked first
+    if dbtype == cx_Oracle.NATIVE_FLOAT or dbtype == cx_Oracle.DB_TYPE_BINARY_FLOAT:
+        return pa.float64()
+    elif dbtype == cx_Oracle.NUMBER:
+        return pa.int64() if (scale == 0 and precision) else pa.float64()
+    elif dbtype == cx_Oracle.DATETIME or dbtype == cx_Oracle.TIMESTAMP:
+        return pa.timestamp("us")
+    else:
+        return pa.string()
+
+
+def spool(cursor, writer, batch_size, depth=4):
+    """
+    Fetch all rows from an executed cursor and pass them to the writer, with
+    fetching on a background thread so that it overlaps with writing. At most
+    `depth` fetched batches are buffered. Returns the number of rows written.
+    """
+    batches = queue.Queue(maxsize=depth)
+
+    def _fetch():
+        try:
+            rows = cursor.fetchmany(batch_size)
+            while rows:
+                batches.put(rows)
+                rows = cursor.fetchmany(batch_size)
+            batches.put(None)
+        except Exception as e:
+            batches.put(e)
+
+    fetcher = threading.Thread(target=_fetch)
+    fetcher.daemon = True
+    fetcher.start()
+
+    n = 0
+    rows = batches.get()
+    while rows is not None:
+        if isinstance(rows, Exception):
+            raise rows
+        writer.write(rows)
+        n += len(rows)
+        rows = batches.get()
+    fetcher.join()
+    return n
+
+# vim: expandtab sw=4 ts=4
@@ -0,0 +1,216 @@
+"""
+3D tensors of (sample, timestep, feature) values stored sparsely in HDF5.
+
+Each subset ("train", "validate" and "test") is a group of typed, contiguous
+arrays sorted by sample, timestep and feature:
+
+    {subset}/sample     int32 sample number within the subset
+    {subset}/timestep   int16 timestep, or -1 for static values that apply
+                        to every timestep
+    {subset}/feature    int32 feature number
+    {subset}/value      float32 min-max normalized value
+    {subset}/ptr        int64 offsets of each sample's entries (CSR-style)
+
+The "features" group holds the feature names, labels, fill values and the
+min-max normalization parameters fitted on the training subset.
+"""
+
+import h5py
+import numpy as np
+import pandas as pd
+from riipl.design import SUBSETS
+
+
+def WriteTensor(tensor, labels, fill_values, population, keys, out, nsteps=None):
+    """
+    Save a dict of feature dataframes as a 3D tensor in `out`.
+
+    `population` is a dataframe with the `keys` columns and a SUBSET column.
+    Each feature dataframe has the `keys` columns, and optionally TIMESTEP and
+    VALUE columns: features without a TIMESTEP are static, and features
+    without a VALUE are indicators. Values are min-max normalized in a single
+    grouped pass over all features, and "mean" or "median" fill values are
+    replaced with the normalized training mean or median.
+    """
+    if isinstance(keys, str):
+        keys = [keys]
+
+    # Sample numbers within each subset
+    population = population[list(keys) + ["SUBSET"]].copy()
+    codes = np.full(len(population), -1, dtype=np.int8)
+    samples = np.zeros(len(population), dtype=np.int32)
+    nsamples = []
+    for k, s in enumerate(SUBSETS):
+        rows = np.flatnonzero(population.SUBSET.values == s)
+        codes[rows] = k
+        samples[rows] = np.arange(len(rows))
+        nsamples.append(len(rows))
+    population["SUBSET"] = codes
+    population["SAMPLE"] = samples
+
+    # Stack all features into one long frame
+    names = list(tensor)
+    scaled = np.zeros(len(names), dtype=bool)
+    frames = []
+    for j, feature in enumerate(names):
+        values = tensor[feature]
+        frame = pd.DataFrame({k: values[k].values for k in keys})
+        frame["FEATURE"] = np.int32(j)
+        frame["TIMESTEP"] = values["TIMESTEP"].values.astype(np.int16) if "TIMESTEP" in values.columns else np.int16(-1)
+        if "VALUE" in values.columns:
+            scaled[j] = True
+            frame["VALUE"] = values["VALUE"].values.astype(float)
+        else:
+            frame["VALUE"] = 1.0
+        frames.append(frame)
+    if frames:
+        entries = pd.concat(frames, ignore_index=True)
+    else:
+        entries = pd.DataFrame({c: [] for c in list(keys) + ["FEATURE", "TIMESTEP", "VALUE"]})
+    entries = entries.merge(population, on=keys, how="left")
+    assert entries.SAMPLE.notnull().all()
+    assert entries.VALUE.notnull().all()
+
+    # Min-max normalization fitted on the training subset, for all features at once
+    feature = entries.FEATURE.values.astype(np.int64)
+    value = entries.VALUE.values
+    train = entries.SUBSET.values == 0
+    grouped = pd.Series(value[train]).groupby(feature[train])
+    lo = grouped.min().reindex(range(len(names))).values
+    hi = grouped.max().reindex(range(len(names))).values
+    m = np.where(scaled, np.fmin(lo, 0), 0.0)
+    r = np.where(scaled, hi - m, 1.0)
+    keep = ~np.isnan(lo)
+    for j in np.flatnonzero(~keep):
+        print("dropping feature missing from training data:", names[j])
+    for j in np.flatnonzero(keep & (r == 0)):
+        print("dropping feature with zero variance:", names[j])
+    keep &= r != 0
+    r = np.where(keep, r, 1.0)
+    value = (value - m[feature]) / r[feature]
+
+    # Fill values from the normalized training values
+    grouped = pd.Series(value[train]).groupby(feature[train])
+    means = grouped.mean().reindex(range(len(names))).values
+    medians = grouped.median().reindex(range(len(names))).values
+    fills = np.zeros(len(names))
+    for j, name in enumerate(names):
+        fill = fill_values.get(name, 0)
+        if scaled[j] and fill == "mean":
+            fill = means[j]
+        elif scaled[j] and fill == "median":
+            fill = medians[j]
+        fills[j] = fill
+        fill_values[name] = fill
+
+    # Renumber the kept features and sort the entries
+    number = np.cumsum(keep) - 1
+    rows = keep[feature]
+    subset = entries.SUBSET.values[rows]
+    sample = entries.SAMPLE.values[rows].astype(np.int32)
+    timestep = entries.TIMESTEP.values[rows].astype(np.int16)
+    feature = number[feature[rows]].astype(np.int32)
+    value = value[rows].astype(np.float32)
+    order = np.lexsort((feature, timestep, sample, subset))
+    subset, sample, timestep, feature, value = (a[order] for a in (subset, sample, timestep, feature, value))
+
+    if nsteps is None:
+        nsteps = int(timestep.max()) + 1 if len(timestep) and timestep.max() >= 0 else 1
+    assert timestep.max(initial=-1) < nsteps
+
+    kept = [names[j] for j in np.flatnonzero(keep)]
+    with h5py.File(out, "w") as f:
+        f.attrs["nsteps"] = nsteps
+        features = f.create_group("features")
+        features.create_dataset("name", data=np.char.encode(np.array(kept, dtype=str), "utf-8"))
+        features.create_dataset("label", data=np.char.encode(np.array([str(labels.get(n, "")) for n in kept], dtype=str), "utf-8"))
+        features.create_dataset("fill", data=fills[keep])
+        features.create_dataset("min", data=m[keep])
+        features.create_dataset("range", data=r[keep])
+        for k, s in enumerate(SUBSETS.values()):
+            lo, hi = np.searchsorted(subset, [k, k + 1])
+            group = f.create_group(s)
+            group.attrs["nsamples"] = nsamples[k]
+            group.create_dataset("sample", data=sample[lo:hi])
+            group.create_dataset("timestep", data=timestep[lo:hi])
+            group.create_dataset("feature", data=feature[lo:hi])
+            group.create_dataset("value", data=value[lo:hi])
+            group.create_dataset("ptr", data=np.searchsorted(sample[lo:hi], np.arange(nsamples[k] + 1)).astype(np.int64))
+            print("[riipl.tensor] {}: {} samples, {} entries".format(s, nsamples[k], hi - lo))
+
+
+class TensorReader(object):
+    """
+    Reads minibatches of samples from a tensor saved by WriteTensor, as dense
+    (samples, timesteps, features) arrays with missing entries set to the fill
+    values and static features broadcast across timesteps.
+    """
+
+    def __init__(self, filename):
+        self.file = h5py.File(filename, "r")
+        features = self.file["features"]
+        self.features = [name.decode("utf-8") for name in features["name"][()]]
+        self.labels = dict(zip(self.features, (label.decode("utf-8") for label in features["label"][()])))
+        self.fill = features["fill"][()]
+        self.fill_values = dict(zip(self.features, self.fill))
+        self.nsteps = int(self.file.attrs["nsteps"])
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def close(self):
+        self.file.close()
+
+
+    def nsamples(self, subset):
+        """
+        Return the number of samples in a subset ("train", "validate" or "test").
+        """
+        return int(self.file[subset].attrs["nsamples"])
+
+
+    def entries(self, subset, start, stop):
+        """
+        Return the (sample, timestep, feature, value) arrays for samples
+        `start` to `stop` of a subset, read as one contiguous range.
+        """
+        group = self.file[subset]
+        lo, hi = group["ptr"][start], group["ptr"][stop]
+        return tuple(group[name][lo:hi] for name in ("sample", "timestep", "feature", "value"))
+
+
+    def batch(self, subset, start, stop):
+        """
+        Return samples `start` to `stop` of a subset as a dense array.
+        """
+        sample, timestep, feature, value = self.entries(subset, start, stop)
+        X = np.empty((stop - start, self.nsteps, len(self.features)), dtype=np.float32)
+        X[:] = self.fill
+        sample = sample - start
+        static = timestep < 0
+        # Static values first, so that any timestep-specific values override them
+        X[sample[static], :, feature[static]] = value[static, np.newaxis]
+        X[sample[~static], timestep[~static], feature[~static]] = value[~static]
+        return X
+
+
+    def minibatches(self, subset, batch_size, shuffle=False, seed=0):
+        """
+        Iterate over a subset in (start, dense array) minibatches of
+        `batch_size` samples. With `shuffle`, the order of the minibatches is
+        randomized, but each one is still read as a contiguous range.
+        """
+        n = self.nsamples(subset)
+        starts = np.arange(0, n, batch_size)
+        if shuffle:
+            np.random.RandomState(seed).shuffle(starts)
+        for start in starts:
+            yield int(start), self.batch(subset, int(start), int(min(start + batch_size, n)))
+
+# vim: expandtab sw=4 ts=4
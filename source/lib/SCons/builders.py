@@ -23,6 +23,7 @@
 
 from SCons.Util import is_String, is_List
 import SCons
+import json
 import os
 import re
 import shutil
@@ -92,8 +93,22 @@ def get_log_path(source_file, env):
     return(log_file)    
 
 
+def set_job_env(target, env, ENV):
+    """
+    Pass the job's targets, dependencies and declared resources to the
+    spawner.
+    """
+    target = make_list_if_string(target)
+    ENV['SCONS_TARGETS'] = ' '.join(str(node) for node in target)
+    ENV['SCONS_SOURCES'] = ' '.join(node_dependencies(target[0]))
+    resources = env.get('resources')
+    if resources:
+        ENV['SCONS_RESOURCES'] = json.dumps(resources)
+
+
 def build_r(target, source, env):
     shell, spawn, escape, ENV = setup_scons_entities(env)
+    set_job_env(target, env, ENV)
 
     source      = [str(node) for node in make_list_if_string(source)]
     target      = [str(node) for node in make_list_if_string(target)]
@@ -126,6 +141,7 @@ def build_r(target, source, env):
 def build_python(target, source, env):
 
     shell, spawn, escape, ENV = setup_scons_entities(env)
+    set_job_env(target, env, ENV)
 
     source = [str(node) for node in make_list_if_string(source)]
     target = [str(node) for node in make_list_if_string(target)]
@@ -134,6 +150,13 @@ def build_python(target, source, env):
 
     ENV['SCONS_LOG_PATH'] = get_log_path(source[0], env)
 
+    # Opt in to running the script in the warm Python worker
+    warm = env.get('warm')
+    if warm is None:
+        warm = os.environ.get('RIIPL_WARM_PYTHON') == '1'
+    if warm:
+        ENV['SCONS_WARM_ARGV'] = json.dumps(source + target)
+
     command = ['python', '-u'] + [x.replace("$", "\$") for x in chain(source, target)]
     result = spawn(shell, escape, command[0], command, ENV)
     if result:
@@ -149,6 +172,7 @@ def build_python(target, source, env):
 stata_error_re = re.compile("^r\(([0-9]+)\);$", flags = re.M)
 def build_stata(target, source, env):
     shell, spawn, escape, ENV = setup_scons_entities(env)
+    set_job_env(target, env, ENV)
 
     source      = [str(node) for node in make_list_if_string(source)]
     target      = [str(node) for node in make_list_if_string(target)]
@@ -196,6 +220,7 @@ def build_stata(target, source, env):
 def build_latex(target, source, env):
 
     shell, spawn, escape, ENV = setup_scons_entities(env)
+    set_job_env(target, env, ENV)
 
     source = [str(node) for node in make_list_if_string(source)]
     target = [str(node) for node in make_list_if_string(target)]
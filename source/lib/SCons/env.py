@@ -1,5 +1,8 @@
+import atexit
+import collections
 import os
 import getpass
+import time
 
 repo_root = Dir(".").abspath
 varnames = ["STATATMP", "PYTHON_DIR", "MATLAB_ROOT",
@@ -9,7 +12,12 @@ varnames = ["STATATMP", "PYTHON_DIR", "MATLAB_ROOT",
             "QTDIR", "QTLIB", "TERM", "SHELL", "DISPLAY", "ORACLE_HOME", 
             "LOADEDMODULES", "SHLVL", "PKG_CONFIG_PATH", "TWO_TASK"]
 
+# Settings for the riipl library, passed to builder scripts only when set
+riipl_varnames = ["RIIPL_CHECKSUM_MODE", "RIIPL_POPULATION_CACHE",
+                  "RIIPL_POOL_MIN", "RIIPL_POOL_MAX", "RIIPL_POOL_DSN", "RIIPL_POOL_DRCP"]
+
 env_vars = {var: os.environ.get(var, "") for var in varnames}
+env_vars.update({var: os.environ[var] for var in riipl_varnames if var in os.environ})
 env_vars.update({
     "REPO_ROOT": repo_root,
     "PYTHONPATH": os.path.abspath("./source/lib/Python"),
@@ -25,24 +33,72 @@ for k, v in CONSTANTS.items(): setattr(env, k, v)
 
 SetupRIIPLLogging(env)
 
-def riipl_decider(dependency, target, prev_ni):
-    # Use SCons" default checking for changes in the source file (MD5)
-    source_changed = dependency.changed_content(target, prev_ni)
-    if source_changed:
-        return source_changed
+# Time spent deciding whether each dependency changed, and how it was decided
+_decider_seconds = collections.defaultdict(float)
+_decider_counts = collections.Counter()
+_target_changed = {}
+
+
+def _metadata_unchanged(node, ninfo):
+    """
+    Whether a node's timestamp and size (last DDL time and segment bytes for
+    SQL tables) match those stored in its node info.
+    """
+    try:
+        return node.get_timestamp() == ninfo.timestamp and node.get_size() == ninfo.size
+    except AttributeError:
+        return False
+
+
+def riipl_decider(dependency, target, prev_ni, repo_node=None):
+    """
+    Decide whether a dependency changed by comparing cheap metadata first, and
+    only computing content signatures (MD5) when the metadata changed. A
+    target is also rebuilt if it was modified outside of SCons.
+    """
+    start = time.time()
+    if _metadata_unchanged(dependency, prev_ni):
+        # Reuse the stored signature instead of hashing the dependency
+        try:
+            dependency.get_ninfo().csig = prev_ni.csig
+        except AttributeError:
+            pass
+        changed = False
+        tier = "metadata"
     else:
-        target_changed = False
+        changed = dependency.changed_content(target, prev_ni)
+        tier = "content"
+    if not changed:
         # If target node does not implement get_csig(), leave figuring out whether to
         # rebuild it and move on
-        try:
-            target_info = target.get_stored_info()
+        key = id(target)
+        if key not in _target_changed:
+            _target_changed[key] = False
+            try:
+                target_info = target.get_stored_info()
+                if not _metadata_unchanged(target, target_info.ninfo):
+                    _target_changed[key] = target_info.ninfo.csig != target.get_csig()
+                    tier += "+target"
+            except AttributeError:
+                pass
+        changed = _target_changed[key]
+    _decider_seconds[str(dependency)] += time.time() - start
+    _decider_counts[tier] += 1
+    return changed
 
-            if target_info.ninfo.csig != target.get_csig():
-                target_changed = True
-        except AttributeError:
-            pass
 
-        return target_changed
+def _print_decider_timing():
+    if not _decider_counts:
+        return
+    print("[riipl_decider] {} decisions in {:.2f}s ({})".format(
+          sum(_decider_counts.values()),
+          sum(_decider_seconds.values()),
+          ", ".join("{} {}".format(n, tier) for tier, n in sorted(_decider_counts.items()))))
+    for node, seconds in sorted(_decider_seconds.items(), key=lambda x: -x[1])[:10]:
+        if seconds >= 0.1:
+            print("[riipl_decider] {:8.2f}s {}".format(seconds, node))
+
+atexit.register(_print_decider_timing)
 
 
 env.Decider(riipl_decider)
@@ -1,8 +1,10 @@
 import sys
 import os
 import errno
+import json
 import subprocess
 import datetime
+import time
 
 log_datetime_format = '%Y-%m-%d %I:%M:%S:%f %p'
 
@@ -36,24 +38,77 @@ class RIIPLCommandSpawner:
                 with open(env['SCONS_LOG_PATH'], 'w') as log_f:
                     log_f.writelines([command_string, start_string])
 
-            # Kick off command
-            proc = subprocess.Popen([sh, '-c', ' '.join(args)],
-                env = env,
-                close_fds = True,
-                stdout = subprocess.PIPE,
-                stderr = subprocess.STDOUT)
-
-            # Tee or print output
-            proc2 = subprocess.Popen(log_command,
-                env = env,
-                close_fds = True,
-                stdin = proc.stdout,
-                stdout = sys.stdout,
-                stderr = sys.stderr)
-
-            proc.stdout.close()
-            retval = proc.wait()
-            proc2.wait()
+            # Wait until the job's declared resources fit in the host budget
+            request = self.scheduler.request(env)
+            waited = self.scheduler.acquire(request)
+            if waited >= 1:
+                print('Waited {:.0f}s for resources: {}'.format(waited, request))
+            # The dependency list and warm argv are only for the spawner, and
+            # can be too long for the job's environment
+            job_env = dict((k, v) for k, v in env.items()
+                           if k not in ('SCONS_SOURCES', 'SCONS_WARM_ARGV'))
+            job_start = time.time()
+            rusage = None
+            retval = None
+            try:
+                warm = env.get('SCONS_WARM_ARGV') and self.warm.available(job_env)
+                if warm:
+                    # Run the script in a fork of the warm Python worker,
+                    # which writes its output to the tee
+                    read_fd, write_fd = os.pipe()
+                    proc2 = subprocess.Popen(log_command,
+                        env = job_env,
+                        close_fds = True,
+                        stdin = read_fd,
+                        stdout = sys.stdout,
+                        stderr = sys.stderr)
+                    os.close(read_fd)
+                    try:
+                        retval, rusage = self.warm.run(json.loads(env['SCONS_WARM_ARGV']),
+                                                       job_env, write_fd)
+                    except (OSError, EOFError) as e:
+                        # The worker refused the job or died before reporting
+                        # back, so stop using it and rerun the job fresh
+                        print('warning: warm Python worker failed, running '
+                              'scripts in fresh processes: {}'.format(e))
+                        self.warm.failed = True
+                        warm = False
+                    proc2.wait()
+                if not warm:
+                    # Kick off command
+                    proc = subprocess.Popen([sh, '-c', ' '.join(args)],
+                        env = job_env,
+                        close_fds = True,
+                        stdout = subprocess.PIPE,
+                        stderr = subprocess.STDOUT)
+
+                    # Tee or print output
+                    proc2 = subprocess.Popen(log_command,
+                        env = job_env,
+                        close_fds = True,
+                        stdin = proc.stdout,
+                        stdout = sys.stdout,
+                        stderr = sys.stderr)
+
+                    proc.stdout.close()
+                    retval, rusage = wait_rusage(proc)
+                    proc2.wait()
+            finally:
+                self.scheduler.release(request)
+                self.profile.job(env, args, job_start, time.time(), waited,
+                                 retval, rusage, self.cache_state())
+
+            # Record the peak RSS (reported in kilobytes on Linux), if the job
+            # ran far enough to report its resource usage
+            if rusage is not None:
+                peak_rss = rusage.ru_maxrss * 1024
+                if retval == 0:
+                    self.scheduler.record(env.get('SCONS_TARGETS'), peak_rss, request)
+                rss_string = 'Peak RSS: {:.0f} MB\n'.format(peak_rss / 1024.0**2)
+                print(rss_string)
+                if env.get('SCONS_LOG_PATH'):
+                    with open(env['SCONS_LOG_PATH'], 'a') as log_f:
+                        log_f.writelines([rss_string])
 
         except OSError as x:
             if x.errno != 10:
@@ -75,9 +130,34 @@ class RIIPLCommandSpawner:
 
         return retval
 
+    def cache_state(self):
+        """
+        Whether a job that ran was a cache miss, or there was no cache.
+        """
+        cache = self.env.get_CacheDir()
+        if cache is not None and cache.is_enabled() and not GetOption('cache_disable'):
+            return 'miss'
+        return None
+
+def wait_rusage(proc):
+    """
+    Wait for a process and return its exit status and resource usage,
+    including the usage of its own child processes.
+    """
+    _, status, rusage = os.wait4(proc.pid, 0)
+    if os.WIFSIGNALED(status):
+        retval = -os.WTERMSIG(status)
+    else:
+        retval = os.WEXITSTATUS(status)
+    proc.returncode = retval
+    return retval, rusage
+
 def SetupRIIPLLogging(env):
     spawner = RIIPLCommandSpawner()
     spawner.env = env
+    spawner.scheduler = ResourceScheduler.from_environ()
+    spawner.profile = build_profile
+    spawner.warm = WarmWorker.from_environ()
     env['SPAWN'] = spawner.spawn
 
 def SetLogPath(env, log_path):
@@ -0,0 +1,159 @@
+"""
+Summarize a build recorded in the build profile: the critical path through
+the dependency graph, the slowest targets, and how well the build used its
+parallel jobs.
+
+    python source/lib/SCons/profile_report.py [--build ID] [--top N] [profile]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+
+def load_builds(filename):
+    """
+    Read the profile into a dict of build id to (header, job records), in
+    the order the builds ran.
+    """
+    builds = {}
+    with open(filename) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted build
+                continue
+            jobs = builds.setdefault(record["build"], [None, []])[1]
+            if record["type"] == "build":
+                builds[record["build"]][0] = record
+            else:
+                jobs.append(record)
+    return builds
+
+
+def critical_path(jobs):
+    """
+    The chain of dependent jobs with the longest total wall time. A job
+    depends on the jobs in the same build that produced any of its sources.
+    """
+    jobs = sorted(jobs, key=lambda job: job["start"])
+    producer = {}
+    length = {}
+    previous = {}
+    for i, job in enumerate(jobs):
+        best = None
+        for source in job["sources"]:
+            j = producer.get(source)
+            if j is not None and (best is None or length[j] > length[best]):
+                best = j
+        length[i] = job["wall"] + (length[best] if best is not None else 0.0)
+        previous[i] = best
+        for target in job["targets"]:
+            producer[target] = i
+    if not jobs:
+        return [], 0.0
+    i = max(length, key=length.get)
+    total = length[i]
+    path = []
+    while i is not None:
+        path.append(jobs[i])
+        i = previous[i]
+    return path[::-1], total
+
+
+def concurrency(jobs):
+    """
+    The peak number of jobs running at once.
+    """
+    events = sorted([(job["start"], 1) for job in jobs] + [(job["end"], -1) for job in jobs])
+    running = peak = 0
+    for _, step in events:
+        running += step
+        peak = max(peak, running)
+    return peak
+
+
+def _name(job):
+    name = job["targets"][0] if job["targets"] else job.get("command", "?")
+    if len(job["targets"]) > 1:
+        name += " (+{} more)".format(len(job["targets"]) - 1)
+    return name
+
+
+def _mb(job, key):
+    value = job.get(key)
+    return "{:9.0f}".format(value / 1024.0**2) if value is not None else "{:>9}".format("-")
+
+
+def report(header, jobs, top=20, out=sys.stdout):
+    start = min([job["start"] for job in jobs] + ([header["start"]] if header else []))
+    span = max(job["end"] for job in jobs) - start
+    busy = sum(job["wall"] for job in jobs)
+    hits = sum(1 for job in jobs if job.get("cache") == "hit")
+    failed = [job for job in jobs if job.get("status") not in (0, None) or
+              (job.get("status") is None and job.get("cache") != "hit")]
+
+    print("Build {}: {} jobs ({} cache hits, {} failed) in {:.1f}s".format(
+        jobs[0]["build"], len(jobs), hits, len(failed), span), file=out)
+    print("  job seconds:       {:.1f}".format(busy), file=out)
+    print("  mean parallelism:  {:.2f}".format(busy / span if span > 0 else 0.0), file=out)
+    print("  peak parallelism:  {}".format(concurrency(jobs)), file=out)
+    num_jobs = header.get("num_jobs") if header else None
+    if num_jobs and span > 0:
+        print("  utilization of -j {}: {:.0%}".format(num_jobs, busy / span / num_jobs), file=out)
+    waited = sum(job.get("waited") or 0.0 for job in jobs)
+    if waited >= 1:
+        print("  waited for resources: {:.1f}s".format(waited), file=out)
+
+    path, length = critical_path(jobs)
+    print("\nCritical path: {:.1f}s ({:.0%} of the build)".format(
+        length, length / span if span > 0 else 0.0), file=out)
+    elapsed = 0.0
+    for job in path:
+        elapsed += job["wall"]
+        print("  {:9.1f}s {:9.1f}s  {}".format(job["wall"], elapsed, _name(job)), file=out)
+
+    print("\nSlowest {} targets:".format(min(top, len(jobs))), file=out)
+    print("  {:>9} {:>9} {:>9} {:>9} {:>9} {:>6}  {}".format(
+        "wall (s)", "cpu (s)", "rss (MB)", "read (MB)", "write(MB)", "status", "targets"), file=out)
+    for job in sorted(jobs, key=lambda job: job["wall"], reverse=True)[:top]:
+        cpu = job.get("cpu_user", 0.0) + job.get("cpu_sys", 0.0) if "cpu_user" in job else None
+        print("  {:9.1f} {} {} {} {} {:>6}  {}".format(
+            job["wall"],
+            "{:9.1f}".format(cpu) if cpu is not None else "{:>9}".format("-"),
+            _mb(job, "peak_rss"), _mb(job, "read_bytes"), _mb(job, "write_bytes"),
+            job.get("cache") if job.get("cache") == "hit" else job.get("status"),
+            _name(job)), file=out)
+
+    if failed:
+        print("\nFailed:", file=out)
+        for job in failed:
+            print("  status {}: {}".format(job.get("status"), _name(job)), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("profile", nargs="?",
+                        default=os.environ.get("RIIPL_PROFILE", os.path.join("scratch", ".build-profile.jsonl")))
+    parser.add_argument("--build", help="build id (default: the most recent build)")
+    parser.add_argument("--top", type=int, default=20, help="number of slowest targets to list")
+    args = parser.parse_args(argv)
+
+    builds = load_builds(args.profile)
+    if args.build:
+        if args.build not in builds:
+            parser.error("no build {} in {}".format(args.build, args.profile))
+        build = args.build
+    else:
+        build = [b for b in builds if builds[b][1]][-1:]
+        if not build:
+            parser.error("no builds recorded in {}".format(args.profile))
+        build = build[0]
+    header, jobs = builds[build]
+    report(header, jobs, top=args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import threading
+import time
+import SCons.CacheDir
+import SCons.Node.Python
+
+# Every job run by the spawner, and every target retrieved from a cache, is
+# recorded as one JSON line in scratch/.build-profile.jsonl (or the file in
+# RIIPL_PROFILE), with its wall and CPU time, peak RSS, bytes read and written,
+# exit status and dependencies. Summarize a build with
+#
+#     python source/lib/SCons/profile_report.py
+
+
+def node_dependencies(node):
+    """
+    The names of the nodes a target depends on: its sources, explicit
+    dependencies and scanned implicit dependencies.
+    """
+    return [str(child) for child in node.children()
+            if not isinstance(child, SCons.Node.Python.Value)]
+
+
+class BuildProfile(object):
+    """
+    Appends per-target execution records for one build to a JSONL file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.build = "{}-{}".format(time.strftime("%Y%m%dT%H%M%S"), os.getpid())
+        self.started = time.time()
+        self._header = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environ(cls):
+        return cls(os.environ.get("RIIPL_PROFILE", os.path.join("scratch", ".build-profile.jsonl")))
+
+    def write(self, record):
+        record = dict(record, build=self.build)
+        with self._lock:
+            try:
+                directory = os.path.dirname(self.filename)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                with open(self.filename, "a") as f:
+                    # The build header is only written once a job runs, so
+                    # up-to-date builds leave no trace
+                    if not self._header:
+                        f.write(json.dumps({"build": self.build,
+                                            "type": "build",
+                                            "start": self.started,
+                                            "num_jobs": GetOption("num_jobs"),
+                                            "argv": sys.argv[1:]}) + "\n")
+                        self._header = True
+                    f.write(json.dumps(record, sort_keys=True) + "\n")
+            except (IOError, OSError) as e:
+                print("warning: could not write build profile: {}".format(e))
+
+    def job(self, env, args, start, end, waited, retval, rusage, cache):
+        """
+        Record a job run by the spawner. `rusage` covers the job's process
+        tree, as returned by os.wait4.
+        """
+        record = {"type": "job",
+                  "targets": env.get("SCONS_TARGETS", "").split(),
+                  "sources": env.get("SCONS_SOURCES", "").split(),
+                  "command": " ".join(args[:3]),
+                  "start": start,
+                  "end": end,
+                  "wall": end - start,
+                  "waited": waited,
+                  "status": retval,
+                  "cache": cache}
+        if rusage is not None:
+            # ru_maxrss is in kilobytes, and block counts are 512-byte blocks
+            record.update({"cpu_user": rusage.ru_utime,
+                           "cpu_sys": rusage.ru_stime,
+                           "peak_rss": rusage.ru_maxrss * 1024,
+                           "read_bytes": rusage.ru_inblock * 512,
+                           "write_bytes": rusage.ru_oublock * 512})
+        self.write(record)
+
+    def cache_hit(self, node, start, end, cache="hit"):
+        """
+        Record a target retrieved from a cache instead of being built.
+        """
+        self.write({"type": "job",
+                    "targets": [str(node)],
+                    "sources": node_dependencies(node),
+                    "start": start,
+                    "end": end,
+                    "wall": end - start,
+                    "status": 0,
+                    "cache": cache})
+
+
+build_profile = BuildProfile.from_environ()
+_cache_retrieve = SCons.CacheDir.CacheDir.retrieve
+
+
+def riipl_cache_retrieve(self, node):
+    """
+    CacheDir.retrieve, recording hits in the build profile.
+    """
+    start = time.time()
+    retrieved = _cache_retrieve(self, node)
+    if retrieved:
+        build_profile.cache_hit(node, start, time.time())
+    return retrieved
+
+SCons.CacheDir.CacheDir.retrieve = riipl_cache_retrieve
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+
+# Builders declare the resources a job needs, e.g.
+#
+#     env.R(targets, sources, resources={"memory": "30G", "cores": 8})
+#
+# and the spawner only starts a job when it fits in the host budget alongside
+# the jobs already running. The budget defaults to 90% of physical memory and
+# all cores, and can be set with RIIPL_MEMORY, RIIPL_CORES and RIIPL_SESSIONS
+# (Oracle sessions). The peak RSS of every job is recorded in
+# scratch/.resources.json to calibrate the declared memory on the next build.
+
+_resource_units = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+default_resources = {"memory": "1G", "cores": 1, "sessions": 0}
+
+
+def parse_memory(value):
+    """
+    Convert a memory amount in bytes, or with a K/M/G/T suffix, to bytes.
+    """
+    if isinstance(value, str) and value[-1:].upper() in _resource_units:
+        return int(float(value[:-1]) * _resource_units[value[-1].upper()])
+    return int(value)
+
+
+def _physical_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 16 * _resource_units["G"]
+
+
+class ResourceScheduler(object):
+    """
+    Admits jobs against a budget of memory, cores and Oracle sessions.
+    """
+
+    def __init__(self, memory=None, cores=None, sessions=None, calibration_file=None):
+        self.budget = {"memory": parse_memory(memory) if memory else int(0.9 * _physical_memory()),
+                       "cores": int(cores or os.cpu_count() or 1),
+                       "sessions": int(sessions or 16)}
+        self.used = {k: 0 for k in self.budget}
+        self.running = 0
+        self.calibration_file = calibration_file
+        self.calibration = {}
+        if calibration_file and os.path.exists(calibration_file):
+            try:
+                with open(calibration_file) as f:
+                    self.calibration = json.load(f)
+            except ValueError:
+                pass
+        self._cv = threading.Condition()
+
+    @classmethod
+    def from_environ(cls):
+        return cls(memory=os.environ.get("RIIPL_MEMORY"),
+                   cores=os.environ.get("RIIPL_CORES"),
+                   sessions=os.environ.get("RIIPL_SESSIONS"),
+                   calibration_file=os.path.join("scratch", ".resources.json"))
+
+    def request(self, env):
+        """
+        The resources requested by a job, from the SCONS_RESOURCES and
+        SCONS_TARGETS variables set by the builders, with the memory
+        calibrated from the job's recorded peak RSS.
+        """
+        declared = dict(default_resources)
+        declared.update(json.loads(env.get("SCONS_RESOURCES") or "{}"))
+        request = {"memory": parse_memory(declared["memory"]),
+                   "cores": int(declared["cores"]),
+                   "sessions": int(declared["sessions"])}
+        record = self.calibration.get(env.get("SCONS_TARGETS", ""))
+        if record:
+            # 20% headroom over the last observed peak. The peak is that of
+            # the largest single process, which undercounts jobs that run
+            # several worker processes, so their declared memory is a floor
+            calibrated = int(1.2 * record["peak_rss"])
+            if request["cores"] > 1:
+                calibrated = max(calibrated, request["memory"])
+            request["memory"] = calibrated
+        # A job larger than the whole budget runs alone
+        return {k: min(v, self.budget[k]) for k, v in request.items()}
+
+    def _fits(self, request):
+        if self.running == 0:
+            return True
+        return all(self.used[k] + request[k] <= self.budget[k] for k in request)
+
+    def acquire(self, request):
+        """
+        Wait until the request fits in the budget, and reserve it. Returns the
+        seconds spent waiting.
+        """
+        start = time.time()
+        with self._cv:
+            while not self._fits(request):
+                self._cv.wait()
+            for k in request:
+                self.used[k] += request[k]
+            self.running += 1
+        return time.time() - start
+
+    def release(self, request):
+        with self._cv:
+            for k in request:
+                self.used[k] -= request[k]
+            self.running -= 1
+            self._cv.notify_all()
+
+    def record(self, targets, peak_rss, request):
+        """
+        Save a job's peak RSS for calibrating its request on the next build.
+        """
+        if not targets or not self.calibration_file:
+            return
+        with self._cv:
+            self.calibration[targets] = {"peak_rss": peak_rss, "requested": request}
+            try:
+                directory = os.path.dirname(self.calibration_file)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                tmp = "{}.{}.tmp".format(self.calibration_file, os.getpid())
+                with open(tmp, "w") as f:
+                    json.dump(self.calibration, f, indent=1, sort_keys=True)
+                os.rename(tmp, self.calibration_file)
+            except (IOError, OSError) as e:
+                print("warning: could not save resource calibration: {}".format(e))
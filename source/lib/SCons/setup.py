@@ -1,5 +1,10 @@
+exec(compile(open("./source/lib/SCons/resources.py").read(), "./source/lib/SCons/resources.py", 'exec'))
+exec(compile(open("./source/lib/SCons/profiling.py").read(), "./source/lib/SCons/profiling.py", 'exec'))
+exec(compile(open("./source/lib/SCons/warm.py").read(), "./source/lib/SCons/warm.py", 'exec'))
 exec(compile(open("./source/lib/SCons/logging.py").read(), "./source/lib/SCons/logging.py", 'exec'))
 exec(compile(open("./source/lib/SCons/env.py").read(), "./source/lib/SCons/env.py", 'exec'))
 exec(compile(open("./source/lib/SCons/misc.py").read(), "./source/lib/SCons/misc.py", 'exec'))
 exec(compile(open("./source/lib/SCons/builders.py").read(), "./source/lib/SCons/builders.py", 'exec'))
+exec(compile(open("./source/lib/SCons/signatures.py").read(), "./source/lib/SCons/signatures.py", 'exec'))
+exec(compile(open("./source/lib/Python/riipl/pool.py").read(), "./source/lib/Python/riipl/pool.py", 'exec'))
 exec(compile(open("./source/lib/SCons/sql_table_node.py").read(), "./source/lib/SCons/sql_table_node.py", 'exec'))
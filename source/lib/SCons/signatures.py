@@ -0,0 +1,85 @@
+import atexit
+import hashlib
+import os
+import tempfile
+import SCons.Node.FS
+import SCons.Util
+
+# Shared index of content signatures for large files, so that a file is hashed
+# once per change for everyone using the same cache directory. Entries are
+# keyed by the file's real path, size, modification time and inode, and stored
+# one per file under the "signatures" directory of the CacheDir (or the
+# directory in RIIPL_SIGNATURE_DB).
+
+_signature_min_size = int(os.environ.get("RIIPL_SIGNATURE_MIN_SIZE", 16 * 1024 * 1024))
+_signature_counts = {"hits": 0, "misses": 0}
+_get_content_hash = SCons.Node.FS.File.get_content_hash
+
+
+def _signature_dir():
+    path = os.environ.get("RIIPL_SIGNATURE_DB")
+    if path:
+        return path
+    # Source files have no build environment of their own, so use the
+    # project's environment and its CacheDir
+    cache = env.get_CacheDir()
+    if cache is None or not getattr(cache, "path", None):
+        return None
+    return os.path.join(cache.path, "signatures")
+
+
+def _signature_entry(directory, path, stat):
+    hash_format = getattr(SCons.Util, "get_current_hash_algorithm_used", lambda: "md5")()
+    key = "{}|{}|{}|{}|{}".format(path, stat.st_size, stat.st_mtime_ns, stat.st_ino, hash_format)
+    key = hashlib.md5(key.encode("utf-8")).hexdigest()
+    return os.path.join(directory, key[:2], key)
+
+
+def riipl_content_hash(self):
+    """
+    File.get_content_hash, which SCons uses for files too large to read into
+    memory, looked up in the shared signature index first.
+    """
+    if not self.rexists():
+        return _get_content_hash(self)
+    path = os.path.realpath(self.rfile().get_abspath())
+    try:
+        stat = os.stat(path)
+        directory = _signature_dir()
+    except OSError:
+        return _get_content_hash(self)
+    if directory is None or stat.st_size < _signature_min_size:
+        return _get_content_hash(self)
+
+    entry = _signature_entry(directory, path, stat)
+    try:
+        with open(entry) as f:
+            csig = f.read().strip()
+        if csig:
+            _signature_counts["hits"] += 1
+            return csig
+    except (IOError, OSError):
+        pass
+
+    csig = _get_content_hash(self)
+    _signature_counts["misses"] += 1
+    try:
+        # Write atomically, since other users may be reading the same entry
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(entry))
+        with os.fdopen(fd, "w") as f:
+            f.write(csig + "\n")
+        os.chmod(tmp, 0o664)
+        os.rename(tmp, entry)
+    except (IOError, OSError) as e:
+        print("warning: could not save signature for {}: {}".format(path, e))
+    return csig
+
+
+def _print_signature_counts():
+    if _signature_counts["hits"] or _signature_counts["misses"]:
+        print("[signatures] {hits} large files found in the signature index, "
+              "{misses} hashed".format(**_signature_counts))
+
+SCons.Node.FS.File.get_content_hash = riipl_content_hash
+atexit.register(_print_signature_counts)
@@ -1,36 +1,274 @@
 import SCons
 import atexit
 import cx_Oracle
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 _owner = env.USERNAME.upper()
 _table_cache = {}
-_cxn = cx_Oracle.connect("/")
+_pool = SessionPool(min=1, max=4)
+_cxn = _pool.acquire()
 _cxn.autocommit = 1
-atexit.register(_cxn.close)
+atexit.register(_pool.close)
+
+# Catalog state of the registered tables, fetched in batches. Cache
+# retrieval runs on the job threads, so access is serialized by the lock
+_catalog = {}
+_catalog_lock = threading.Lock()
+_catalog_timing = {"tables": 0, "queries": 0, "probes": 0, "seconds": 0.0}
 
 env.Default(".")
 
+
+def _fetch_catalog():
+    """
+    Fetch the existence, emptiness, size, timestamp and comment of every
+    registered table that is not in the catalog yet, with one query per 1000
+    tables. Tables whose optimizer statistics are missing or older than their
+    last DDL are probed for a first row in parallel, instead of counting all
+    of their rows.
+    """
+    names = sorted(name for name in _table_cache if name not in _catalog)
+    if not names:
+        return
+    start = time.time()
+    found = {}
+    cur = _cxn.cursor()
+    for i in range(0, len(names), 1000):
+        batch = names[i:i+1000]
+        binds = ", ".join(":t{}".format(j) for j in range(len(batch)))
+        cur.execute("""
+                    SELECT t.table_name,
+                           t.num_rows,
+                           CASE WHEN t.last_analyzed >= o.last_ddl_time THEN 1 ELSE 0 END AS fresh,
+                           s.bytes,
+                           ROUND((o.last_ddl_time - TO_DATE('19700101', 'YYYYMMDD'))*24*3600) AS mtime,
+                           c.comments
+                      FROM user_tables t
+                 LEFT JOIN (SELECT segment_name, SUM(bytes) AS bytes
+                              FROM user_segments
+                             WHERE segment_type = 'TABLE'
+                          GROUP BY segment_name) s
+                        ON s.segment_name = t.table_name
+                 LEFT JOIN user_objects o
+                        ON o.object_name = t.table_name AND o.object_type = 'TABLE'
+                 LEFT JOIN user_tab_comments c
+                        ON c.table_name = t.table_name
+                     WHERE t.table_name IN ({})
+                    """.format(binds), {"t{}".format(j): name for j, name in enumerate(batch)})
+        for name, num_rows, fresh, size, mtime, comments in cur:
+            found[name] = {"nonempty": bool(fresh and num_rows) or None,
+                           "size": size or 0,
+                           "timestamp": mtime or 0,
+                           "contents": comments}
+        _catalog_timing["queries"] += 1
+    cur.close()
+
+    def _probe(name):
+        with _pool.session() as cxn:
+            cur = cxn.cursor()
+            cur.execute("SELECT 1 FROM {} WHERE ROWNUM = 1".format(name))
+            nonempty = cur.fetchone() is not None
+            cur.close()
+        return nonempty
+
+    probes = [name for name, entry in found.items() if entry["nonempty"] is None]
+    if probes:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for name, nonempty in zip(probes, executor.map(_probe, probes)):
+                found[name]["nonempty"] = nonempty
+        _catalog_timing["probes"] += len(probes)
+
+    for name in names:
+        entry = found.get(name, {"nonempty": False, "size": 0, "timestamp": 0, "contents": None})
+        entry["exists"] = entry.pop("nonempty")
+        _catalog[name] = entry
+    _catalog_timing["tables"] += len(names)
+    _catalog_timing["seconds"] += time.time() - start
+
+
+def _catalog_entry(name):
+    with _catalog_lock:
+        if name not in _catalog:
+            _fetch_catalog()
+        return _catalog[name]
+
+
+def _print_catalog_timing():
+    if _catalog_timing["tables"]:
+        print("[sql_table_node] scanned {tables} tables with {queries} catalog queries "
+              "and {probes} row probes in {seconds:.2f}s".format(**_catalog_timing))
+
+atexit.register(_print_catalog_timing)
+
+# Schema holding copies of built tables, keyed by build signature
+_cache_schema = os.environ.get("RIIPL_TABLE_CACHE", "").upper()
+
+
+def _cache_table(node):
+    """
+    Name of the cached copy of a table, from the signatures of everything
+    the table is built from (like a file's CacheDir path).
+    """
+    sigs = [getattr(child, "get_cachedir_csig", child.get_csig)() for child in node.children()]
+    sigs.append(SCons.Util.MD5signature(node.get_executor().get_contents()))
+    sigs.append(node.name)
+    return "{}.RIIPL_{}".format(_cache_schema, SCons.Util.MD5collect(sigs)[:24].upper())
+
+
+def _cache_enabled(node):
+    return bool(_cache_schema) and node.has_builder() and not GetOption("cache_disable")
+
+
+def _drop_table(cur, name):
+    try:
+        cur.execute("DROP TABLE {} CASCADE CONSTRAINTS PURGE".format(name))
+    # cx_Oracle.DatabaseError: ORA-00942: table or view does not exist
+    except cx_Oracle.DatabaseError as rc:
+        if not "ORA-00942" in str(rc):
+            raise rc
+
+
+class _TableFS(object):
+    """
+    Stands in for a file node's file system when SCons removes targets that
+    were retrieved from the cache before the rest of their build missed.
+    """
+
+    def unlink(self, name):
+        with _pool.session() as cxn:
+            cur = cxn.cursor()
+            _drop_table(cur, name)
+            cur.close()
+        with _catalog_lock:
+            _catalog.pop(name, None)
+
+
 class _SQLTable(SCons.Node.Node):
 
     NodeInfo = SCons.Node.FS.FileNodeInfo
     BuildInfo = SCons.Node.FS.FileBuildInfo
+    fs = _TableFS()
 
     def __init__(self, name):
         SCons.Node.Node.__init__(self)
         self.name = name
         self.store_info = 1
         self.ninfo = self.new_ninfo()
-        self.changed_since_last_build = 1
+        # Decide changes with the environment's decider, like file targets
+        self.changed_since_last_build = 5
         self.dir = Dir("#.")
         self.set_nocache()
 
     def __str__(self):
         return self.name
 
+    def get_internal_path(self):
+        return self.name
+
     def built(self):
+        # The table was just rebuilt, so its catalog entry is stale
+        with _catalog_lock:
+            _catalog.pop(self.name, None)
         SCons.Node.Node.built(self)
         SCons.Node.store_info_map[self.store_info](self)
 
+    def retrieve_from_cache(self):
+        """
+        Restore the table from the table cache with a CTAS, if a copy built
+        from the same signatures exists there. Runs on a job thread, so it
+        uses its own session.
+        """
+        if not _cache_enabled(self):
+            return False
+        start = time.time()
+        owner, name = _cache_table(self).split(".")
+        with _pool.session() as cxn:
+            retrieved = self._retrieve(cxn.cursor(), owner, name)
+        if retrieved:
+            print("Retrieved `{}' from table cache {}.{}".format(self.name, owner, name))
+            build_profile.cache_hit(self, start, time.time())
+        return retrieved
+
+    def _retrieve(self, cur, owner, name):
+        cur.execute("""
+                    SELECT comments
+                      FROM all_tab_comments
+                     WHERE owner = :owner AND table_name = :name
+                    """, owner=owner, name=name)
+        row = cur.fetchone()
+        # The comment is written last, so a copy without one is incomplete
+        if row is None or not row[0]:
+            cur.close()
+            return False
+        meta = json.loads(row[0])
+        _drop_table(cur, self.name)
+        cur.execute("CREATE TABLE {} NOLOGGING PARALLEL AS SELECT * FROM {}.{}".format(self.name, owner, name))
+        cur.execute("ALTER TABLE {} NOPARALLEL".format(self.name))
+        if meta["pk"]:
+            cur.execute("ALTER TABLE {0} ADD CONSTRAINT {0}_PK PRIMARY KEY ({1})".format(self.name, ", ".join(meta["pk"])))
+        cur.execute("COMMENT ON TABLE {} IS '{}'".format(self.name, meta["comment"].replace("'", "''")))
+        cur.execute("ALTER TABLE {} READ ONLY".format(self.name))
+        # After the DDL, so that the catalog can trust the row count
+        cur.execute("ANALYZE TABLE {} COMPUTE STATISTICS".format(self.name))
+        cur.close()
+        return True
+
+    def push_to_cache(self):
+        """
+        Copy the built table, its checksum comment and its primary key into
+        the table cache.
+        """
+        if not _cache_enabled(self):
+            return
+        owner, name = _cache_table(self).split(".")
+        with _pool.session() as cxn:
+            self._push(cxn.cursor(), owner, name)
+
+    def _push(self, cur, owner, name):
+        cur.execute("""
+                    SELECT comments
+                      FROM all_tab_comments
+                     WHERE owner = :owner AND table_name = :name
+                    """, owner=owner, name=name)
+        row = cur.fetchone()
+        if row is not None and row[0]:
+            cur.close()
+            return
+        # Read the new table's comment directly, since the catalog and memo
+        # still describe the table as it was before this build
+        cur.execute("""
+                    SELECT comments
+                      FROM user_tab_comments
+                     WHERE table_name = :name
+                    """, name=self.name)
+        row = cur.fetchone()
+        if row is None:
+            cur.close()
+            return
+        cur.execute("""
+                    SELECT c.column_name
+                      FROM user_constraints k
+                      JOIN user_cons_columns c
+                        ON c.constraint_name = k.constraint_name
+                     WHERE k.constraint_type = 'P' AND k.table_name = :name
+                  ORDER BY c.position
+                    """, name=self.name)
+        meta = {"table": self.name,
+                "comment": row[0] or "",
+                "pk": [column for column, in cur]}
+        try:
+            _drop_table(cur, "{}.{}".format(owner, name))
+            cur.execute("CREATE TABLE {}.{} NOLOGGING AS SELECT * FROM {}".format(owner, name, self.name))
+            cur.execute("COMMENT ON TABLE {}.{} IS '{}'".format(owner, name, json.dumps(meta).replace("'", "''")))
+        except cx_Oracle.DatabaseError as rc:
+            # Caching is best effort, like a full or read-only CacheDir
+            print("warning: could not push `{}' to table cache: {}".format(self.name, rc))
+        cur.close()
+
     def str_for_display(self):
         return "'" + self.__str__() + "'"
 
@@ -43,30 +281,22 @@ class _SQLTable(SCons.Node.Node):
     @SCons.Memoize.CountMethodCall
     def exists(self):
         """
-        The table exists if it has an entry in all_tables.
+        The table exists if it has an entry in user_tables and at least one row.
         """
         try:
             return self._memo["exists"]
         except KeyError:
             pass
-        cur = _cxn.cursor()
-        cur.execute("""
-                    SELECT table_name
-                      FROM user_tables
-                     WHERE table_name = '{}'
-                    """.format(self.name.upper()))
-        exists = cur.fetchone() is not None
-        if exists:
-            cur.execute("""
-                        SELECT COUNT(*)
-                          FROM {}
-                        """.format(self.name.upper()))
-            count = cur.fetchone()
-            exists = count is not None and count[0] > 0
-        cur.close()
+        exists = _catalog_entry(self.name)["exists"]
         self._memo["exists"] = exists
         return exists
 
+    def changed_content(self, target, prev_ni, repo_node=None):
+        try:
+            return self.get_csig() != prev_ni.csig
+        except AttributeError:
+            return True
+
     def get_csig(self):
         ninfo = self.get_ninfo()
         try:
@@ -89,42 +319,20 @@ class _SQLTable(SCons.Node.Node):
             return self._memo["get_size"]
         except KeyError:
             pass
-        if self.exists():
-            cur = _cxn.cursor()
-            cur.execute("""
-                        SELECT bytes
-                          FROM user_segments
-                         WHERE segment_type = 'TABLE' AND
-                               segment_name = '{}'
-                        """.format(self.name.upper()))
-            size = cur.fetchone()[0]
-            cur.close()
-        else:
-            size = 0
+        size = _catalog_entry(self.name)["size"] if self.exists() else 0
         self._memo["get_size"] = size
         return size
 
     @SCons.Memoize.CountMethodCall
     def get_timestamp(self):
         """
-        The table's timestamp is its last DDL time from all_objects.
+        The table's timestamp is its last DDL time from user_objects.
         """
         try:
             return self._memo["get_timestamp"]
         except KeyError:
             pass
-        if self.exists():
-            cur = _cxn.cursor()
-            cur.execute("""
-                        SELECT FLOOR(last_ddl_time - TO_DATE('19700101', 'YYYYMMDD'))*24*3600 AS mtime
-                          FROM user_objects
-                         WHERE object_type = 'TABLE' AND
-                               object_name = '{}'
-                        """.format(self.name.upper()))
-            ts = cur.fetchone()[0]
-            cur.close()
-        else:
-            ts = 0
+        ts = _catalog_entry(self.name)["timestamp"] if self.exists() else 0
         self._memo["get_timestamp"] = ts
         return ts
 
@@ -149,13 +357,7 @@ class _SQLTable(SCons.Node.Node):
             return self._memo['get_contents']
         except KeyError:
             pass
-        cur = _cxn.cursor()
-        cur.execute("""
-                    SELECT comments
-                      FROM user_tab_comments
-                     WHERE table_name = '{}'
-                    """.format(self.name.upper()))
-        contents = cur.fetchone()[0]
+        contents = _catalog_entry(self.name)["contents"]
         self._memo['get_contents'] = contents
         return contents
 
@@ -0,0 +1,93 @@
+import atexit
+import importlib.util
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+
+# env.Python targets declared with warm=True (or every env.Python target,
+# when RIIPL_WARM_PYTHON=1) run in a fork of a warm worker that has already
+# imported numpy, pandas, h5py, matplotlib, seaborn and cx_Oracle, instead of
+# a fresh interpreter. Scripts that are unsafe to fork, e.g. ones that start
+# multiprocessing with the "spawn" method, are declared with warm=False.
+
+_warm_worker_script = os.path.abspath("./source/lib/SCons/warm_worker.py")
+
+# The worker's message framing is shared with the client
+_spec = importlib.util.spec_from_file_location("warm_worker", _warm_worker_script)
+warm_worker = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(warm_worker)
+
+
+class WarmWorker(object):
+    """
+    Client for the warm worker, which is started on the first warm job and
+    stopped when SCons exits.
+    """
+
+    def __init__(self, modules=None):
+        self.modules = modules or []
+        self.proc = None
+        self.path = None
+        self.failed = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environ(cls):
+        modules = os.environ.get("RIIPL_WARM_MODULES")
+        return cls(modules.split(",") if modules else None)
+
+    def _start(self, env):
+        directory = tempfile.mkdtemp(prefix="riipl-warm-")
+        self.path = os.path.join(directory, "worker.sock")
+        self.proc = subprocess.Popen(["python", "-u", _warm_worker_script, self.path] + self.modules,
+                                     env=env,
+                                     close_fds=True,
+                                     stdin=subprocess.DEVNULL,
+                                     stdout=subprocess.PIPE)
+        if self.proc.stdout.readline().strip() != b"ready":
+            raise OSError("warm worker exited with status {}".format(self.proc.wait()))
+        atexit.register(self.stop)
+
+    def available(self, env):
+        """
+        Start the worker if it is not running. Returns False if it could not
+        be started, in which case jobs run in a fresh process.
+        """
+        with self._lock:
+            if self.proc is None and not self.failed:
+                try:
+                    self._start(env)
+                except OSError as e:
+                    print("warning: could not start warm Python worker, running "
+                          "scripts in fresh processes: {}".format(e))
+                    self.failed = True
+            return not self.failed and self.proc.poll() is None
+
+    def run(self, argv, env, out_fd):
+        """
+        Run a script with its arguments in a fork of the worker, writing its
+        output to out_fd. Returns the exit status and resource usage.
+        """
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self.path)
+            warm_worker.send_message(conn, {"argv": argv, "cwd": os.getcwd(), "env": dict(env)}, [out_fd])
+            os.close(out_fd)
+            out_fd = None
+            reply, _ = warm_worker.recv_message(conn)
+        finally:
+            conn.close()
+            if out_fd is not None:
+                os.close(out_fd)
+        return reply["status"], resource.struct_rusage(reply["rusage"])
+
+    def stop(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            self.proc.wait()
+        if self.path:
+            shutil.rmtree(os.path.dirname(self.path), ignore_errors=True)
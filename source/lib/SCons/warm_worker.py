@@ -0,0 +1,189 @@
+"""
+Warm Python worker for env.Python targets.
+
+Imports the heavy third-party libraries once, then listens on a Unix socket.
+For each job it forks a supervisor, which forks the process that runs the
+script with the job's argv, cwd, environment and output file descriptor, and
+reports its exit status and resource usage back to the spawner. Every job
+runs in a fresh fork, so no module state is shared between jobs.
+
+    python -u source/lib/SCons/warm_worker.py SOCKET [MODULE ...]
+"""
+
+import array
+import atexit
+import importlib
+import io
+import json
+import os
+import random
+import runpy
+import select
+import socket
+import sys
+import threading
+import traceback
+
+default_modules = ["numpy", "pandas", "scipy.sparse", "h5py", "matplotlib.pyplot",
+                   "seaborn", "cx_Oracle"]
+
+
+def send_message(conn, message, fds=()):
+    """
+    Send a JSON message, and optionally file descriptors, over a Unix socket.
+    """
+    data = json.dumps(message).encode("utf-8") + b"\n"
+    if fds:
+        conn.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))])
+    else:
+        conn.sendall(data)
+
+
+def recv_message(conn, maxfds=0):
+    """
+    Receive a JSON message sent by send_message, and any file descriptors.
+    """
+    fds = array.array("i")
+    chunks = []
+    while True:
+        data, ancdata, _, _ = conn.recvmsg(65536, socket.CMSG_SPACE(maxfds * fds.itemsize) if maxfds else 0)
+        for level, kind, cmsg in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(cmsg[:len(cmsg) - (len(cmsg) % fds.itemsize)])
+        if not data:
+            break
+        chunks.append(data)
+        if data.endswith(b"\n"):
+            break
+    if not chunks:
+        raise EOFError("connection closed")
+    return json.loads(b"".join(chunks).decode("utf-8")), list(fds)
+
+
+def run_script(request, out_fd):
+    """
+    Run a script as `python -u` would, in the current (forked) process, and
+    return its exit status.
+    """
+    os.dup2(out_fd, 1)
+    os.dup2(out_fd, 2)
+    os.close(out_fd)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False))
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), write_through=True)
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), write_through=True)
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    argv = request["argv"]
+    sys.argv = list(argv)
+    paths = [os.path.abspath(p) for p in request["env"].get("PYTHONPATH", "").split(os.pathsep) if p]
+    sys.path[0:0] = [os.path.dirname(os.path.abspath(argv[0]))] + [p for p in paths if p not in sys.path]
+
+    # A fresh interpreter seeds its random generators from the OS, so forks
+    # of the same worker must not share the worker's state
+    random.seed()
+    if "numpy" in sys.modules:
+        sys.modules["numpy"].random.seed()
+
+    try:
+        runpy.run_path(argv[0], run_name="__main__")
+        status = 0
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException as e:
+        # Hide the worker's frames, as a fresh interpreter would
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != argv[0]:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        status = 1
+    try:
+        # As at interpreter exit: join non-daemon threads (and so the workers
+        # of concurrent.futures executors), then run the atexit functions
+        threading._shutdown()
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        traceback.print_exc()
+        status = status or 1
+    return status
+
+
+def supervise(conn, server):
+    """
+    Handle one job: fork the script runner, wait for it, and report back.
+    """
+    server.close()
+    request, fds = recv_message(conn, maxfds=1)
+    pid = os.fork()
+    if pid == 0:
+        conn.close()
+        status = 1
+        try:
+            status = run_script(request, fds[0])
+        finally:
+            os._exit(status)
+    for fd in fds:
+        os.close(fd)
+    _, status, rusage = os.wait4(pid, 0)
+    if os.WIFSIGNALED(status):
+        retval = -os.WTERMSIG(status)
+    else:
+        retval = os.WEXITSTATUS(status)
+    send_message(conn, {"status": retval, "rusage": list(rusage)})
+    conn.close()
+
+
+def serve(path, modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print("warm worker: could not import {}: {}".format(name, e), file=sys.stderr)
+
+    parent = os.getppid()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(64)
+    print("ready", flush=True)
+
+    # Exit when SCons does, even if it could not shut the worker down
+    while os.getppid() == parent:
+        readable, _, _ = select.select([server], [], [], 1.0)
+        if readable:
+            conn, _ = server.accept()
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    supervise(conn, server)
+                    code = 0
+                except BaseException:
+                    traceback.print_exc()
+                finally:
+                    os._exit(code)
+            conn.close()
+        # Reap finished supervisors
+        try:
+            while os.waitpid(-1, os.WNOHANG)[0]:
+                pass
+        except ChildProcessError:
+            pass
+
+
+if __name__ == "__main__":
+    # This directory holds the SCons extensions, whose logging.py would
+    # shadow the standard library's
+    del sys.path[0]
+    serve(sys.argv[1], sys.argv[2:] or default_modules)
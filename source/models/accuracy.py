@@ -1,15 +1,22 @@
 import pandas as pd
 import sys
+from riipl import Accuracy
 
-y_pred_file, out_file = sys.argv[1:]
+y_pred_file, out_file, metrics_file, calibration_file = sys.argv[1:]
 
-y = pd.read_csv(y_pred_file).sort_values("y_pred", ascending=False)
-decile = len(y) // 10
+accuracy = Accuracy()
+with pd.read_csv(y_pred_file, usecols=["y_pred", "y_test"], chunksize=1000000) as chunks:
+    for chunk in chunks:
+        accuracy.update(chunk["y_test"], chunk["y_pred"])
 
-with open(out_file, "w") as f:
-    print("decile,size,outcomes", file=f)
-    for i in range(1, 11):
-        y_i = y.iloc[(i-1)*decile:i*decile]
-        print("{},{},{}".format(i, decile, y_i["y_test"].sum()), file=f)
+lift = accuracy.lift(10)
+print(lift)
+lift[["decile", "size", "outcomes"]].to_csv(out_file, index=False, float_format="%g")
+
+metrics = accuracy.summary()
+print(metrics)
+metrics.to_csv(metrics_file, index=False)
+
+accuracy.calibration(10).to_csv(calibration_file, index=False)
 
 # vim: expandtab sw=4 ts=4
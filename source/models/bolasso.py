@@ -1,30 +1,26 @@
 import pandas as pd
 import sys
+from riipl import BetaStore
 
 manifest_file = sys.argv[1]
-beta_files    = sys.argv[2:-2]
-matrix_file   = sys.argv[-2]
-csv_file      = sys.argv[-1]
+beta_files    = sys.argv[2:-3]
+matrix_file   = sys.argv[-3]
+csv_file      = sys.argv[-2]
+store_file    = sys.argv[-1]
 
 # Load manifest
 manifest = pd.read_csv(manifest_file, sep="\t", header=None, names=["var", "desc"])\
              .drop_duplicates("var")\
              .set_index("var")
 
-beta = pd.read_csv(beta_files[0], names=["var", "coef"], skiprows=1, index_col="var")
+# Only re-read the bootstraps that changed since the last run
+store = BetaStore(store_file)
+store.update(beta_files)
 
-bolasso = pd.DataFrame(index=beta.index)
-bolasso["bootstrap0"] = (beta.coef != 0).astype(int)
+store.selections().to_csv(matrix_file)
 
-for i, beta_file, in enumerate(beta_files[1:], start=1):
-    beta = pd.read_csv(beta_files[i], names=["var", "coef"], skiprows=1, index_col="var")
-    pd.testing.assert_index_equal(bolasso.index, beta.index)
-    bolasso["bootstrap{}".format(i)] = (beta.coef != 0).astype(int)
-
-bolasso.to_csv(matrix_file)
-
-bolasso["freq"] = bolasso.sum(axis=1)
-bolasso = bolasso.join(manifest).sort_values("freq", ascending=False).reset_index()
-bolasso[["freq", "var", "desc"]].to_csv(csv_file, index=False)
+bolasso = store.stats().join(manifest).sort_values("freq", ascending=False, kind="mergesort").reset_index()
+bolasso[["freq", "var", "desc", "prob", "sign_consistency", "coef_mean", "coef_lower", "coef_upper"]]\
+    .to_csv(csv_file, index=False)
 
 # vim: expandtab sw=4 ts=4
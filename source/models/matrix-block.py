@@ -0,0 +1,10 @@
+import os
+import sys
+from riipl import DesignMatrix
+
+outcomes_file, feature_file = sys.argv[1:3]
+out_dir = os.path.dirname(sys.argv[-1])
+
+DesignMatrix(outcomes_file).build_block(feature_file, out_dir)
+
+# vim: expandtab sw=4 ts=4
@@ -0,0 +1,43 @@
+import unittest, os, tempfile
+import numpy as np
+import pandas as pd
+from riipl import *
+
+
+class TestBetaStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.coef = np.array([[0.5, 0.2, 0.0, 0.1],
+                              [0.0, 0.0, 0.0, 0.0],
+                              [-1.0, 2.0, -3.0, 0.0]])
+        self.files = [os.path.join(self.tmp, "beta.{}.csv".format(i)) for i in range(4)]
+        for i, f in enumerate(self.files):
+            self.write(i, self.coef[:, i])
+
+    def write(self, i, coef):
+        pd.Series(coef, index=["intercept", "x1", "x2"]).to_csv(self.files[i])
+
+    def test_stats(self):
+        store = BetaStore(os.path.join(self.tmp, "betas.h5"))
+        self.assertTrue(store.update(self.files) == 4)
+        stats = store.stats()
+        self.assertTrue(list(stats.freq) == [3, 0, 3])
+        self.assertTrue(np.allclose(stats.prob, [0.75, 0, 0.75]))
+        self.assertTrue(np.isclose(stats.sign_consistency["x2"], 2 / 3))
+        self.assertTrue(np.isclose(stats.coef_mean["intercept"], 0.2))
+        self.assertTrue(store.selections().values.sum() == 6)
+
+    def test_incremental(self):
+        filename = os.path.join(self.tmp, "betas.h5")
+        BetaStore(filename).update(self.files)
+        self.write(1, [0.0, 0.3, 0.0])
+        store = BetaStore(filename)
+        self.assertTrue(store.update(self.files) == 1)
+        self.assertTrue(list(store.freq) == [2, 1, 2])
+        self.assertTrue(list(BetaStore(filename).stats().freq) == [2, 1, 2])
+        self.assertTrue(BetaStore(filename).update(self.files) == 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
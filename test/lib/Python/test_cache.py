@@ -0,0 +1,104 @@
+import contextlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import riipl.pool
+from riipl.cache import PopulationCache
+
+
+class StandInPool(object):
+    """
+    A session pool whose sessions are a single in-memory sqlite database,
+    which records the queries run against it.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.queries = []
+        self.cxn = sqlite3.connect(":memory:")
+        self.cxn.set_trace_callback(self.queries.append)
+
+    @contextlib.contextmanager
+    def session(self):
+        yield self.cxn
+
+
+class StandInCache(PopulationCache):
+    """
+    Looks up checksums in a dict instead of the table comments.
+    """
+
+    checksums = {}
+
+    def _checksum(self, table):
+        return self.checksums.get(table.upper())
+
+
+class TestPopulationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.default_pool = riipl.pool._default_pool
+        self.pool = riipl.pool._default_pool = StandInPool()
+        self.pool.cxn.executescript("""
+                                    CREATE TABLE pop (id INTEGER, subset INTEGER, name TEXT, amount REAL);
+                                    INSERT INTO pop VALUES (3, 1, 'c', 3.5);
+                                    INSERT INTO pop VALUES (1, 0, NULL, NULL);
+                                    INSERT INTO pop VALUES (2, 1, 'b', 2.5);
+                                    CREATE TABLE other (id INTEGER);
+                                    INSERT INTO other VALUES (1);
+                                    """)
+        StandInCache.checksums = {"POP": "abc", "OTHER": "def"}
+        self.pool.queries.clear()
+
+    def tearDown(self):
+        riipl.pool._default_pool = self.default_pool
+        shutil.rmtree(self.directory)
+
+    def selects(self):
+        return [q for q in self.pool.queries if q.lstrip().startswith("SELECT")]
+
+    def test_round_trip(self):
+        cache = StandInCache(directory=self.directory)
+        population = cache.get("pop", "id", ["name", "amount"])
+        self.assertTrue(list(population["id"]) == [1, 2, 3])
+        cache.clear()
+        loaded = StandInCache(directory=self.directory).get("pop", "id", ["name", "amount"])
+        self.assertTrue(len(self.selects()) == 1)
+        self.assertTrue(list(loaded["id"]) == [1, 2, 3])
+        self.assertTrue(list(loaded["name"].isnull()) == [True, False, False])
+        self.assertTrue(list(loaded["name"].iloc[1:]) == ["b", "c"])
+        self.assertTrue(np.isnan(loaded["amount"].iloc[0]))
+        self.assertTrue(list(loaded["amount"].iloc[1:]) == [2.5, 3.5])
+        self.assertTrue(loaded.equals(population))
+
+    def test_lru(self):
+        cache = StandInCache(maxsize=2)
+        StandInCache.checksums = {}
+        a = cache.get("pop", "id")
+        cache.get("pop", "id", ["subset"])
+        self.assertTrue(cache.get("pop", "id") is a)
+        cache.get("other", "id")
+        self.assertTrue(len(self.selects()) == 3)
+        # The least recently used population was evicted
+        self.assertTrue(cache.get("pop", "id") is a)
+        cache.get("pop", "id", ["subset"])
+        self.assertTrue(len(self.selects()) == 4)
+
+    def test_checksum(self):
+        cache = StandInCache(directory=self.directory)
+        a = cache.get("pop", "id")
+        self.assertTrue(cache.get("pop", "id") is a)
+        self.pool.cxn.execute("INSERT INTO pop VALUES (4, 0, 'd', 4.5)")
+        StandInCache.checksums["POP"] = "abd"
+        b = cache.get("pop", "id")
+        self.assertTrue(list(b["id"]) == [1, 2, 3, 4])
+        self.assertTrue(len(self.selects()) == 2)
+        self.assertTrue(len(os.listdir(self.directory)) == 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -47,6 +47,29 @@ class TestConnection(unittest.TestCase):
         self.assertTrue(results["local"] == 8.2702)
         self.assertTrue(results["localer"] == 5.3298)
 
+    def test_bind_substitution(self):
+        with Connection(binds=True) as cxn:
+            cxn.execute("CREATE TABLE test_connection(scope VARCHAR2(30), value NUMBER)")
+            for scope, value in [("global", GLOBAL_PARAM), ("local", np.float64(8.2702))]:
+                cxn.execute("INSERT INTO test_connection(scope, value) VALUES('%scope%', %value%)")
+            cursor = cxn.execute("SELECT * FROM test_connection WHERE scope = '%scope%'")
+            results = cursor.fetchall()
+            cxn.execute("DROP TABLE test_connection PURGE")
+
+        self.assertTrue(results == [("local", 8.2702)])
+
+    def test_bind_substitution_in_literal(self):
+        prefix = "loc"
+        with Connection(binds=True) as cxn:
+            cxn.execute("CREATE TABLE test_connection(scope VARCHAR2(30), value NUMBER)")
+            for scope, value in [("global", GLOBAL_PARAM), ("local", 8.2702)]:
+                cxn.execute("INSERT INTO test_connection(scope, value) VALUES('%scope%', %value%)")
+            cursor = cxn.execute("SELECT * FROM test_connection WHERE scope LIKE '%prefix%al' AND value > 0")
+            results = cursor.fetchall()
+            cxn.execute("DROP TABLE test_connection PURGE")
+
+        self.assertTrue(results == [("local", 8.2702)])
+
     def test_connection_basic(self):
         me = pyodbc.connect("DSN=RIIPL").cursor().execute("SELECT USER FROM DUAL").fetchall()[0][0]
         cxn = Connection()
@@ -82,6 +105,60 @@ class TestConnection(unittest.TestCase):
             cxn.save_table("test_read_dataframe")
             cxn.clear_tables("test_read_dataframe")
 
+    def test_read_dataframe_executemany(self):
+        df = pd.DataFrame({"df_float":  np.arange(0.0, 10.0),
+                           "df_int":    np.arange(0, 10, dtype="u4"),
+                           "df_string": [str(i) for i in range(10)],
+                           "df_dt":     pd.date_range("2017-01-01", "2017-01-10")})
+        df.loc[3, "df_float"] = np.nan
+        with Connection() as cxn:
+            cxn.read_dataframe(df, "test_read_dataframe", mode="executemany", batch_size=4)
+            results = cxn.execute("SELECT COUNT(*), COUNT(df_float) FROM test_read_dataframe").fetchone()
+            cxn.clear_tables("test_read_dataframe")
+        self.assertTrue(results == (10, 9))
+
+    def test_read_sql_chunks(self):
+        df = pd.DataFrame({"df_float": np.arange(0.0, 10.0),
+                           "df_int":   np.arange(0, 10)})
+        with Connection() as cxn:
+            cxn.read_dataframe(df, "test_read_sql_chunks", schema=[("df_float", "NUMBER"),
+                                                                   ("df_int", "NUMBER(10)")])
+            chunks = list(cxn.read_sql_chunks("SELECT * FROM test_read_sql_chunks ORDER BY df_int",
+                                              chunksize=4))
+            cxn.clear_tables("test_read_sql_chunks")
+        self.assertTrue([len(chunk) for chunk in chunks] == [4, 4, 2])
+        result = pd.concat(chunks, ignore_index=True)
+        self.assertTrue(result["DF_INT"].dtype == np.int64)
+        self.assertTrue((result["DF_FLOAT"].values == df["df_float"].values).all())
+
+    def test_executemany(self):
+        table = "test_executemany"
+        df = pd.DataFrame({"ID": np.arange(10), "AMOUNT": np.arange(0.0, 10.0)})
+        with Connection() as cxn:
+            cxn.clear_tables(table)
+            cxn.execute("CREATE TABLE %table% (id NUMBER(2) PRIMARY KEY, amount NUMBER)")
+            cxn.executemany("INSERT INTO %table% (id, amount) VALUES (%ID%, %AMOUNT%)",
+                            df, batch_size=3, commit_every=2)
+            errors = cxn.executemany("INSERT INTO %table% (id, amount) VALUES (:1, :2)",
+                                     [(9, 1.0), (10, 2.0)], batcherrors=True)
+            results = cxn.execute("SELECT COUNT(*), SUM(amount) FROM %table%").fetchone()
+            cxn.clear_tables(table)
+        self.assertTrue(len(errors) == 1 and errors[0][0] == 0)
+        self.assertTrue(results == (11, 47))
+
+    def test_executemany_tuples(self):
+        table = "test_executemany"
+        with Connection() as cxn:
+            cxn.clear_tables(table)
+            cxn.execute("CREATE TABLE %table% (id NUMBER(2), amount NUMBER)")
+            cxn.executemany("INSERT INTO %table% (id, amount) VALUES (%ID%, %AMOUNT%)",
+                            [(1, 2.0), (3, 4.0)], fields=["ID", "AMOUNT"])
+            results = cxn.execute("SELECT id, amount FROM %table% ORDER BY id").fetchall()
+            with self.assertRaises(ValueError):
+                cxn.executemany("INSERT INTO %table% (id) VALUES (%ID%)", [(1, 2.0)], fields=["ID"])
+            cxn.clear_tables(table)
+        self.assertTrue(results == [(1, 2), (3, 4)])
+
     def test_read_csv(self):
         filename = os.path.join(os.path.dirname(__file__), "test_read_csv.csv")
         schema = (("df_dt", "DATE 'YYYYMMDD'"),
@@ -0,0 +1,47 @@
+import unittest, os, tempfile
+import numpy as np
+import pandas as pd
+from riipl import *
+
+
+class TestDesignMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        n = 20
+        index = pd.Index(np.arange(100, 100 + n), name="SAMPLE_ID")
+        self.outcomes = pd.DataFrame({"SUBSET": np.tile(["TRAINING", "VALIDATION", "TRAINING", "TESTING"], n // 4),
+                                      "y": np.arange(n) % 2},
+                                     index=index)
+        self.outcomes_file = os.path.join(self.tmp, "outcomes.csv")
+        self.outcomes.to_csv(self.outcomes_file)
+        rng = np.random.RandomState(0)
+        self.a = pd.DataFrame({"a1": rng.binomial(1, 0.2, n), "a2": rng.normal(size=n)}, index=index)
+        self.b = pd.DataFrame({"b1": rng.binomial(1, 0.5, n)}, index=index)
+
+    def test_blocks(self):
+        a_file = os.path.join(self.tmp, "a.csv")
+        self.a.to_csv(a_file)
+        b_file = os.path.join(self.tmp, "b.mtx")
+        SaveSparse(DataFrameToSparse(self.b), self.b.columns, b_file)
+
+        design = DesignMatrix(self.outcomes_file, chunksize=7)
+        design.build_block(a_file, os.path.join(self.tmp, "a"))
+        design.build_block(b_file, os.path.join(self.tmp, "b"))
+
+        X = pd.concat([self.a, self.b], axis=1)
+        for subset, name in [("train", "TRAINING"), ("validate", "VALIDATION"), ("test", "TESTING")]:
+            matrix, columns = ReadDesignMatrix([os.path.join(self.tmp, "a"), os.path.join(self.tmp, "b")], subset)
+            expected = X[self.outcomes.SUBSET == name]
+            self.assertTrue(columns == list(X.columns))
+            self.assertTrue(np.allclose(matrix.toarray(), expected.values))
+            self.assertTrue(len(design.outcomes_for(subset)) == len(expected))
+
+    def test_misaligned(self):
+        a_file = os.path.join(self.tmp, "a.csv")
+        self.a.iloc[::-1].to_csv(a_file)
+        with self.assertRaises(ValueError):
+            DesignMatrix(self.outcomes_file).build_block(a_file, os.path.join(self.tmp, "a"))
+
+if __name__ == "__main__":
+    unittest.main()
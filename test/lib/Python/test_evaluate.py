@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+import pandas as pd
+from riipl import *
+
+trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+class TestAccuracy(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        n = 1000
+        self.y_pred = np.round(rng.uniform(size=n), 2)
+        self.y_test = rng.binomial(1, self.y_pred)
+
+    def test_chunks(self):
+        whole = Accuracy().update(self.y_test, self.y_pred)
+        chunked = Accuracy()
+        for start in range(0, len(self.y_test), 37):
+            chunked.update(self.y_test[start:start + 37], self.y_pred[start:start + 37])
+        self.assertTrue(whole.lift().equals(chunked.lift()))
+        self.assertTrue(whole.summary().equals(chunked.summary()))
+
+    def test_lift(self):
+        # Without ties, matches slicing the sorted predictions
+        y_pred = np.arange(1000) / 1000
+        accuracy = Accuracy().update(self.y_test, y_pred)
+        y = pd.DataFrame({"y_pred": y_pred, "y_test": self.y_test}).sort_values("y_pred", ascending=False)
+        expected = [y.y_test.iloc[i * 100:(i + 1) * 100].sum() for i in range(10)]
+        self.assertTrue(list(accuracy.lift().outcomes) == expected)
+        # Ties and remainders keep every row and outcome
+        lift = Accuracy().update(self.y_test[:999], self.y_pred[:999]).lift()
+        self.assertTrue(lift["size"].sum() == 999)
+        self.assertTrue(np.isclose(lift.outcomes.sum(), self.y_test[:999].sum()))
+
+    def test_auc(self):
+        accuracy = Accuracy().update(self.y_test, self.y_pred)
+        ranks = pd.Series(self.y_pred).rank().values
+        npos = self.y_test.sum()
+        nneg = len(self.y_test) - npos
+        expected = (ranks[self.y_test == 1].sum() - npos * (npos + 1) / 2) / (npos * nneg)
+        self.assertTrue(np.isclose(accuracy.auc(), expected))
+        fpr, tpr, _ = accuracy.roc_curve()
+        self.assertTrue(np.isclose(trapezoid(tpr, fpr), expected))
+
+    def test_auprc(self):
+        accuracy = Accuracy().update(self.y_test, self.y_pred)
+        # Numerically integrate the interpolated precision-recall curve
+        recall, precision, _ = accuracy.pr_curve()
+        tp = np.concatenate([[0], recall * self.y_test.sum()])
+        fp = np.concatenate([[0], tp[1:] / precision - tp[1:]])
+        area = 0
+        for i in range(len(tp) - 1):
+            if tp[i + 1] > tp[i]:
+                x = np.linspace(0, tp[i + 1] - tp[i], 2001)
+                s = (fp[i + 1] - fp[i]) / (tp[i + 1] - tp[i])
+                p = np.where(x + tp[i] > 0, (tp[i] + x) / np.maximum(tp[i] + fp[i] + (1 + s) * x, 1e-12), 1 / (1 + s))
+                area += trapezoid(p, x)
+        self.assertTrue(np.isclose(accuracy.auprc(), area / self.y_test.sum(), rtol=1e-6))
+        self.assertTrue(Accuracy().update([1, 1, 0, 0], [0.9, 0.8, 0.2, 0.1]).auprc() == 1)
+
+    def test_brier(self):
+        accuracy = Accuracy().update(self.y_test, self.y_pred)
+        self.assertTrue(np.isclose(accuracy.brier(), np.mean((self.y_pred - self.y_test) ** 2)))
+        calibration = accuracy.calibration()
+        self.assertTrue(np.isclose((calibration.predicted * calibration["size"]).sum(), self.y_pred.sum()))
+
+
+if __name__ == "__main__":
+    unittest.main()
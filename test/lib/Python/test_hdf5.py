@@ -0,0 +1,50 @@
+import unittest, os, tempfile
+import numpy as np
+import pandas as pd
+from riipl import *
+
+
+class TestHDF5(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        n = 50
+        self.df = pd.DataFrame({"RIIPL_ID": np.arange(1000, 1000 + n),
+                                "AGE": np.arange(n) % 17 + 0.5,
+                                "SEX": np.tile(["F", "M"], n // 2),
+                                "DT": pd.date_range("2010-01-01", periods=n)}).set_index("RIIPL_ID")
+
+    def test_roundtrip(self):
+        for kwargs in [{}, {"chunks": 8, "compression": "gzip"}]:
+            filename = os.path.join(self.tmp, "features.h5")
+            WriteHDF5(self.df, filename, **kwargs)
+            df = ReadHDF5(filename, usecols=["AGE", "SEX", "DT"], index_col="RIIPL_ID")
+            df["SEX"] = df.SEX.str.decode("utf-8")
+            self.assertTrue(df.equals(self.df))
+
+    def test_rows(self):
+        filename = os.path.join(self.tmp, "features.h5")
+        WriteHDF5(self.df, filename)
+        df = ReadHDF5(filename, usecols=["AGE"], index_col="RIIPL_ID", rows=slice(10, 20))
+        self.assertTrue(df.AGE.equals(self.df.AGE.iloc[10:20]))
+        df = ReadHDF5(filename, usecols=["AGE"], index_col="RIIPL_ID", rows=[3, 7, 40])
+        self.assertTrue(df.AGE.equals(self.df.AGE.iloc[[3, 7, 40]]))
+
+    def test_population(self):
+        filename = os.path.join(self.tmp, "features.h5")
+        WriteHDF5(self.df, filename, chunks=16, compression="lzf")
+        population = pd.DataFrame(index=pd.Index([1049, 1002, 1010, 9999], name="RIIPL_ID"))
+        df = ReadHDF5(filename, usecols=["AGE", "DT"], index_col="RIIPL_ID", population=population)
+        self.assertTrue(list(df.index) == [1002, 1010, 1049])
+        self.assertTrue(df.DT.equals(self.df.DT.loc[[1002, 1010, 1049]]))
+
+    def test_iter(self):
+        filename = os.path.join(self.tmp, "features.h5")
+        WriteHDF5(self.df, filename)
+        chunks = list(IterHDF5(filename, chunksize=16, usecols=["AGE"], index_col="RIIPL_ID"))
+        self.assertTrue([len(c) for c in chunks] == [16, 16, 16, 2])
+        self.assertTrue(pd.concat(chunks).AGE.equals(self.df.AGE))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest, os, tempfile
+import numpy as np
+import pandas as pd
+from riipl import *
+
+
+class TestNormalizer(unittest.TestCase):
+
+    def setUp(self):
+        index = pd.Index(np.arange(8), name="SAMPLE_ID")
+        self.train = pd.Series([True] * 6 + [False] * 2, index=index)
+        self.x = pd.DataFrame({"constant": [1.0] * 8,
+                               "dummy":    [0, 1, 0, 1, 1, 0, 1, 0],
+                               "amount":   [1.0, 2.0, 3.0, np.nan, 5.0, 6.0, 7.0, 8.0],
+                               "color":    ["red", "blue", "blue", "green", "blue", "red", "pink", None]},
+                              index=index)
+
+    def test_transform(self):
+        X = Normalizer().fit(self.x, self.train).transform(self.x)
+        self.assertTrue(list(X.columns) == ["dummy", "amount", "amount_MISSING", "color_RED", "color_GREEN"])
+        self.assertTrue((X["dummy"].values == self.x["dummy"].values).all())
+        amount = self.x.loc[self.train, "amount"]
+        expected = ((self.x["amount"] - amount.mean()) / amount.std()).fillna(0)
+        self.assertTrue(np.allclose(X["amount"].values, expected.values))
+        self.assertTrue((X["amount_MISSING"].values == [0, 0, 0, 1, 0, 0, 0, 0]).all())
+        self.assertTrue((X["color_RED"].values == [1, 0, 0, 0, 0, 1, 0, 0]).all())
+        self.assertTrue((X["color_GREEN"].values == [0, 0, 0, 1, 0, 0, 0, 0]).all())
+
+    def test_chunked_csv(self):
+        tmp = tempfile.mkdtemp()
+        features = os.path.join(tmp, "features.csv")
+        out = os.path.join(tmp, "features.normalized.csv")
+        params = os.path.join(tmp, "features.normalizer.json")
+        self.x.to_csv(features)
+
+        normalizer = Normalizer(["SUBSET"]).fit_csv(features, self.train, index_col="SAMPLE_ID", chunksize=3)
+        normalizer.save(params)
+        Normalizer.load(params).transform_csv(features, out, index_col="SAMPLE_ID", chunksize=3)
+
+        expected = Normalizer().fit(self.x, self.train).transform(self.x)
+        result = pd.read_csv(out, index_col="SAMPLE_ID")
+        self.assertTrue(list(result.columns) == list(expected.columns))
+        self.assertTrue(np.allclose(result.values, expected.values))
+
+    def test_chunked_csv_null_first_chunk(self):
+        tmp = tempfile.mkdtemp()
+        features = os.path.join(tmp, "features.csv")
+        x = self.x.assign(late=[None, None, None, "a", "b", "a", "b", None])
+        x.to_csv(features)
+
+        normalizer = Normalizer().fit_csv(features, self.train, index_col="SAMPLE_ID", chunksize=3)
+        expected = Normalizer().fit(x, self.train)
+        self.assertTrue(normalizer.output_columns() == expected.output_columns())
+        late = [p for p in normalizer.params if p["name"] == "late"]
+        self.assertTrue(late == [p for p in expected.params if p["name"] == "late"])
+        self.assertTrue(late[0]["type"] == "categorical")
+
+        x.assign(amount=["1.0"] * 3 + ["a"] * 5).to_csv(features)
+        with self.assertRaises(ValueError):
+            Normalizer().fit_csv(features, self.train, index_col="SAMPLE_ID", chunksize=3)
+
+    def test_sparse(self):
+        tmp = tempfile.mkdtemp()
+        features = os.path.join(tmp, "features.csv")
+        self.x.to_csv(features)
+        normalizer = Normalizer().fit(self.x, self.train)
+        expected = normalizer.transform(self.x)
+        for ext in SPARSE_EXTENSIONS:
+            out = os.path.join(tmp, "features.normalized" + ext)
+            normalizer.transform_csv(features, out, index_col="SAMPLE_ID", chunksize=3)
+            matrix, columns = ReadSparse(out)
+            self.assertTrue(columns == list(expected.columns))
+            self.assertTrue(np.allclose(matrix.toarray(), expected.values))
+
+    def test_index_mismatch(self):
+        with self.assertRaises(ValueError):
+            tmp = tempfile.mkdtemp()
+            features = os.path.join(tmp, "features.csv")
+            self.x.iloc[::-1].to_csv(features)
+            Normalizer().fit_csv(features, self.train, index_col="SAMPLE_ID")
+
+if __name__ == "__main__":
+    unittest.main()
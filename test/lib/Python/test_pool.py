@@ -0,0 +1,73 @@
+import unittest
+from riipl import *
+
+
+class StandInConnection(object):
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+class StandInPool(object):
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.min = kwargs["min"]
+        self.max = kwargs["max"]
+        self.increment = kwargs["increment"]
+        self.opened = self.min
+        self.busy = 0
+        self.closed = False
+
+    def acquire(self, **kwargs):
+        self.busy += 1
+        self.opened = max(self.opened, self.busy)
+        return StandInConnection(**kwargs)
+
+    def release(self, cxn):
+        self.busy -= 1
+
+    def close(self, force=False):
+        self.closed = True
+
+
+class StandInDriver(object):
+    SPOOL_ATTRVAL_WAIT = 1
+    ATTR_PURITY_SELF = 2
+    SessionPool = StandInPool
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def test_acquire_release(self):
+        pool = SessionPool(min=1, max=4, stmtcachesize=20, driver=StandInDriver)
+        self.assertTrue(pool._pool.kwargs["externalauth"])
+        a = pool.acquire()
+        with pool.session() as b:
+            self.assertTrue(pool.stats()["busy"] == 2)
+        pool.release(a)
+        stats = pool.stats()
+        self.assertTrue(stats["busy"] == 0)
+        self.assertTrue(stats["opened"] == 2)
+        self.assertTrue(stats["acquires"] == 2)
+        self.assertTrue(stats["releases"] == 2)
+        self.assertTrue(stats["stmtcachesize"] == 20)
+        pool.close()
+        self.assertTrue(pool._pool.closed)
+
+    def test_drcp(self):
+        pool = SessionPool(drcp=True, cclass="TEST", dsn="host/service:pooled", driver=StandInDriver)
+        cxn = pool.acquire()
+        self.assertTrue(pool._pool.kwargs["dsn"] == "host/service:pooled")
+        self.assertTrue(cxn.kwargs == {"cclass": "TEST", "purity": StandInDriver.ATTR_PURITY_SELF})
+
+    def test_connection_uses_pool(self):
+        pool = SessionPool(driver=StandInDriver)
+        with Connection(pool=pool) as cxn:
+            self.assertTrue(pool.stats()["busy"] == 1)
+        self.assertTrue(pool.stats()["busy"] == 0)
+        with self.assertRaises(IllegalStateException):
+            cxn.close()
+
+if __name__ == "__main__":
+    unittest.main()
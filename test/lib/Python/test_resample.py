@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import pandas as pd
+from riipl import *
+
+
+def auc(df):
+    # Mann-Whitney statistic with midranks for ties
+    ranks = df.y_pred.rank()
+    pos = df.y_test == 1
+    npos, nneg = pos.sum(), (~pos).sum()
+    return (ranks[pos].sum() - npos * (npos + 1) / 2) / (npos * nneg)
+
+
+def lift(df):
+    # Top decile lift for data without tied predictions at the cutoff
+    df = df.sort_values("y_pred", ascending=False, kind="mergesort")
+    return df.y_test.iloc[:len(df) // 10].mean() / df.y_test.mean()
+
+
+class TestBootstrap(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        n = 200
+        self.df = pd.DataFrame({"y_test": rng.binomial(1, 0.3, n),
+                                "y_pred": np.round(rng.uniform(size=n), 2)})
+
+    def test_compatible(self):
+        # Same replicates as resampling with DataFrame.sample
+        N = 40
+        statistic = lambda df: df.y_test.mean()
+        replicates = sorted(statistic(self.df.sample(n=len(self.df), replace=True, random_state=7 + i))
+                            for i in range(N))
+        expected = (statistic(self.df), replicates[int(0.025 * N)], replicates[int(0.975 * N)])
+        self.assertTrue(bootstrap(self.df, N, statistic, 7) == expected)
+        self.assertTrue(np.allclose(bootstrap(self.df.y_test, N, "mean", 7), expected))
+
+    def test_auc(self):
+        fast = bootstrap_replicates(self.df, 20, "auc", 3, block_size=6)
+        slow = bootstrap_replicates(self.df, 20, auc, 3)
+        self.assertTrue(np.allclose(fast, slow))
+
+    def test_lift(self):
+        df = self.df.assign(y_pred=np.arange(len(self.df)) + 0.5 * self.df.y_test)
+        fast = bootstrap_replicates(df, 20, "lift", 3, weights="poisson")
+        self.assertTrue(np.all(np.isfinite(fast)))
+        self.assertTrue(np.isclose(bootstrap(df, 20, "lift", 3)[0], lift(df)))
+
+    def test_processes(self):
+        serial = bootstrap_replicates(self.df, 30, "auc", 11, block_size=4)
+        parallel = bootstrap_replicates(self.df, 30, "auc", 11, processes=3, block_size=4)
+        self.assertTrue(np.array_equal(serial, parallel))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+import cx_Oracle
+import pandas as pd
+from riipl import *
+from riipl import spool
+
+DESCRIPTION = [("ID", cx_Oracle.DB_TYPE_NUMBER, None, None, 10, 0, True),
+               ("AMOUNT", cx_Oracle.DB_TYPE_NUMBER, None, None, 0, -127, True),
+               ("RATE", cx_Oracle.DB_TYPE_BINARY_DOUBLE, None, None, 0, 0, True),
+               ("DT", cx_Oracle.DB_TYPE_DATE, None, None, None, None, True),
+               ("NAME", cx_Oracle.DB_TYPE_VARCHAR, None, None, None, None, True)]
+
+ROWS = [(i, i / 2, i / 4 if i % 3 else None, datetime.datetime(2017, 1, 1 + i % 28), "n{}".format(i))
+        for i in range(100)]
+
+
+class StandInCursor(object):
+    """
+    Serves ROWS, treating each row's ID as its ROWID, and answers the extent
+    query for the table with 10 extents of 10 rows.
+    """
+
+    def __init__(self):
+        self.description = None
+        self.rows = []
+        self.arraysize = 100
+
+    def execute(self, sql, lo=None, hi=None):
+        if "user_extents" in sql:
+            self.rows = [(i, i + 9, 10) for i in range(0, 100, 10)]
+        elif "1 = 0" in sql:
+            self.description = DESCRIPTION
+            self.rows = []
+        elif lo is not None:
+            self.rows = [row for row in ROWS if lo <= row[0] <= hi]
+        else:
+            self.description = DESCRIPTION
+            self.rows = list(ROWS)
+        return self
+
+    def fetchmany(self, n):
+        rows, self.rows = self.rows[:n], self.rows[n:]
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+
+class StandInConnection(object):
+
+    def cursor(self):
+        return StandInCursor()
+
+    def commit(self):
+        pass
+
+
+class StandInPool(object):
+
+    def acquire(self):
+        return StandInConnection()
+
+    def release(self, cxn):
+        pass
+
+    def session(self):
+
+        class _Session(object):
+            def __enter__(self):
+                return StandInConnection()
+
+            def __exit__(self, *args):
+                return False
+
+        return _Session()
+
+
+class TestSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def spool_to(self, filename, **kwargs):
+        path = os.path.join(self.dir, filename)
+        cursor = StandInCursor().execute("SELECT * FROM T")
+        writer = spool.open_writer(path, cursor.description, **kwargs)
+        try:
+            n = spool.spool(cursor, writer, 7)
+        finally:
+            writer.close()
+        self.assertTrue(n == len(ROWS))
+        return path
+
+    def test_csv(self):
+        for ext in (".csv", ".csv.gz"):
+            df = pd.read_csv(self.spool_to("t" + ext))
+            self.assertTrue(list(df.columns) == ["ID", "AMOUNT", "RATE", "DT", "NAME"])
+            self.assertTrue(len(df) == len(ROWS))
+            self.assertTrue(df["AMOUNT"].iloc[3] == 1.5 and df["NAME"].iloc[99] == "n99")
+            self.assertTrue(df["RATE"].isnull().sum() == 34)
+
+    def test_csv_no_header(self):
+        df = pd.read_csv(self.spool_to("t.csv", header=False), header=None)
+        self.assertTrue(len(df) == len(ROWS))
+
+    def test_arrow(self):
+        for ext, read in ((".parquet", pd.read_parquet), (".feather", pd.read_feather)):
+            df = read(self.spool_to("t" + ext))
+            self.assertTrue(df["ID"].dtype == "int64")
+            self.assertTrue(df["AMOUNT"].dtype == "float64")
+            self.assertTrue(df["RATE"].dtype == "float64")
+            self.assertTrue(df["DT"].dtype.kind == "M")
+            self.assertTrue(df["ID"].tolist() == list(range(100)))
+            self.assertTrue(df["RATE"].isnull().sum() == 34)
+            self.assertTrue(df["DT"].iloc[28] == pd.Timestamp("2017-01-01"))
+            self.assertTrue(df["NAME"].iloc[5] == "n5")
+
+    def test_arrow_types(self):
+        import pyarrow as pa
+        types = [spool._arrow_type(pa, d) for d in DESCRIPTION]
+        self.assertTrue(types == [pa.int64(), pa.float64(), pa.float64(), pa.timestamp("us"), pa.string()])
+
+    def test_infer_format(self):
+        self.assertTrue(spool.infer_format("a.csv.gz") == "csv.gz")
+        self.assertTrue(spool.infer_format("a.parquet") == "parquet")
+        with self.assertRaises(ValueError):
+            spool.infer_format("a.txt")
+
+    def test_spool_table(self):
+        path = os.path.join(self.dir, "t.{}.parquet")
+        with Connection(pool=StandInPool()) as cxn:
+            filenames = cxn.spool_table("T", path, shards=3)
+        self.assertTrue(filenames == [path.format(i) for i in range(3)])
+        shards = [pd.read_parquet(filename) for filename in filenames]
+        self.assertTrue(sorted(len(shard) for shard in shards) == [30, 30, 40])
+        df = pd.concat(shards)
+        self.assertTrue(sorted(df["ID"]) == list(range(100)))
+        self.assertTrue(df["AMOUNT"].dtype == "float64")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+import re
+import threading
+import unittest
+import cx_Oracle
+import numpy as np
+import pandas as pd
+from riipl import *
+from riipl.connection import _frame_from_rows
+
+
+class StandInCursor(object):
+    """
+    Answers the catalog query for a table's columns, and returns each
+    expression of any other SELECT as its value, so that tests can check
+    where every expression ended up.
+    """
+
+    def __init__(self, cxn):
+        self.cxn = cxn
+        self.result = None
+
+    def execute(self, sql, *args, **kwargs):
+        self.cxn.pool.statements.append(sql)
+        if "user_tab_cols" in sql:
+            self.result = list(self.cxn.pool.columns)
+        else:
+            select = re.match(r"\s*SELECT\s+(/\*\+.*?\*/\s*)?(.*)\s+FROM\s+\w+\s*$", sql, re.S)
+            self.result = [tuple(select.group(2).split(", "))]
+        return self
+
+    def executemany(self, sql, rows, batcherrors=False):
+        self.cxn.pool.statements.append(sql)
+        self.cxn.pool.rows.extend(rows)
+
+    def getbatcherrors(self):
+        return []
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+    def close(self):
+        pass
+
+
+class StandInConnection(object):
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def commit(self):
+        pass
+
+
+class StandInPool(object):
+    """
+    A session pool that hands out stand-in connections and records every
+    statement executed on them.
+    """
+
+    def __init__(self, columns=()):
+        self.columns = columns
+        self.statements = []
+        self.rows = []
+        self.sessions = set()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        return StandInConnection(self)
+
+    def release(self, cxn):
+        pass
+
+    def session(self):
+        pool = self
+
+        class _Session(object):
+            def __enter__(self):
+                with pool._lock:
+                    pool.sessions.add(threading.get_ident())
+                return StandInConnection(pool)
+
+            def __exit__(self, *args):
+                return False
+
+        return _Session()
+
+
+def describe(name, dbtype, precision=None, scale=None):
+    """
+    A cursor description entry, as cx_Oracle 8 reports it.
+    """
+    return (name, dbtype, None, None, precision, scale, True)
+
+
+class TestFrameFromRows(unittest.TestCase):
+
+    def test_types(self):
+        description = [describe("ID", cx_Oracle.DB_TYPE_NUMBER, 10, 0),
+                       describe("AMOUNT", cx_Oracle.DB_TYPE_NUMBER, 0, -127),
+                       describe("MISSING", cx_Oracle.DB_TYPE_NUMBER, 10, 0),
+                       describe("DT", cx_Oracle.DB_TYPE_DATE),
+                       describe("NAME", cx_Oracle.DB_TYPE_VARCHAR)]
+        rows = [(1, 1.5, None, "2017-01-01", "a"),
+                (2, 2.5, 3, "2017-01-02", "b")]
+        frame = _frame_from_rows(rows, description)
+        self.assertTrue(frame["ID"].dtype == np.int64)
+        self.assertTrue(frame["AMOUNT"].dtype == np.float64)
+        self.assertTrue(frame["MISSING"].dtype == np.float64)
+        self.assertTrue(frame["DT"].dtype.kind == "M")
+        self.assertTrue(frame["DT"].iloc[1] == pd.Timestamp("2017-01-02"))
+
+
+class TestGetStats(unittest.TestCase):
+
+    columns = [("N{}".format(i), "NUMBER") for i in range(150)] + [("D", "DATE"), ("S", "VARCHAR2")]
+
+    def test_single_statement(self):
+        pool = StandInPool(self.columns[:3])
+        with Connection(pool=pool) as cxn:
+            stats = cxn.get_stats("T")
+        self.assertTrue(len(pool.statements) == 2)
+        self.assertTrue(list(stats.columns) == ["Variable", "COUNT", "AVG", "STDDEV", "MIN", "MAX"])
+        self.assertTrue(stats["AVG"].iloc[1] == 'AVG("N1")')
+
+    def test_chunks(self):
+        pool = StandInPool(self.columns)
+        with Connection(pool=pool) as cxn:
+            stats = cxn.get_stats("T", quantiles=[0.25, 0.5, 0.75], distinct=True,
+                                  sessions=4, degree=8)
+        selects = [sql for sql in pool.statements if "user_tab_cols" not in sql]
+        # 9 expressions per column, so 111 columns fit in 1000 expressions
+        self.assertTrue(len(selects) == 2)
+        for sql in selects:
+            self.assertTrue(sql.startswith("SELECT /*+ PARALLEL(8) */ "))
+            self.assertTrue(len(sql.split(" FROM ")[0].split(", ")) <= 1000)
+        self.assertTrue(len(stats) == len(self.columns))
+        self.assertTrue(list(stats.columns) == ["Variable", "COUNT", "AVG", "STDDEV", "MIN", "MAX",
+                                                "DISTINCT", "P25", "P50", "P75"])
+        row = stats.set_index("Variable").loc["N140"]
+        self.assertTrue(row["COUNT"] == 'COUNT("N140")')
+        self.assertTrue(row["DISTINCT"] == 'APPROX_COUNT_DISTINCT("N140")')
+        self.assertTrue(row["P50"] == 'APPROX_PERCENTILE(0.5) WITHIN GROUP (ORDER BY "N140")')
+        row = stats.set_index("Variable").loc["D"]
+        self.assertTrue(row["MIN"] == 'MIN("D")' and row["AVG"] == "NULL" and row["P25"] == "NULL")
+        row = stats.set_index("Variable").loc["S"]
+        self.assertTrue(row["DISTINCT"] == 'APPROX_COUNT_DISTINCT("S")' and row["MAX"] == "NULL")
+
+    def test_small_chunks(self):
+        pool = StandInPool(self.columns[:10])
+        with Connection(pool=pool) as cxn:
+            stats = cxn.get_stats("T", chunksize=12, sessions=3)
+        selects = [sql for sql in pool.statements if "user_tab_cols" not in sql]
+        # 5 expressions per column, so 2 columns per statement
+        self.assertTrue(len(selects) == 5)
+        self.assertTrue(list(stats["MAX"]) == ['MAX("N{}")'.format(i) for i in range(10)])
+
+
+
+class TestExecutemany(unittest.TestCase):
+
+    def test_tuple_fields(self):
+        table = "T"
+        ID = 99
+        pool = StandInPool()
+        with Connection(pool=pool) as cxn:
+            cxn.executemany("INSERT INTO %table% (id, amount) VALUES (%ID%, %AMOUNT%)",
+                            [(1, 2.0), (3, 4.0)], fields=["ID", "AMOUNT"])
+        # Row fields are bound even when a variable of the same name is in scope
+        self.assertTrue(pool.statements == ["INSERT INTO T (id, amount) VALUES (:1, :2)"])
+        self.assertTrue(pool.rows == [(1, 2.0), (3, 4.0)])
+
+    def test_tuple_order(self):
+        table = "T"
+        pool = StandInPool()
+        with Connection(pool=pool) as cxn:
+            cxn.executemany("UPDATE %table% SET amount = %AMOUNT% WHERE id = %ID%",
+                            [(1, 2.0), (3, 4.0)], fields=["ID", "AMOUNT"])
+        self.assertTrue(pool.statements == ["UPDATE T SET amount = :1 WHERE id = :2"])
+        self.assertTrue(pool.rows == [(2.0, 1), (4.0, 3)])
+
+    def test_tuple_positional(self):
+        table = "T"
+        pool = StandInPool()
+        with Connection(pool=pool) as cxn:
+            cxn.executemany("INSERT INTO %table% (id, amount) VALUES (:1, :2)", [(1, 2.0)])
+            with self.assertRaises(ValueError):
+                cxn.executemany("INSERT INTO %table% (id) VALUES (%ID%)", [(1, 2.0)], fields=["ID"])
+            with self.assertRaises(NameError):
+                cxn.executemany("INSERT INTO %table% (id) VALUES (%ID%)", [(1,)])
+        self.assertTrue(pool.statements == ["INSERT INTO T (id, amount) VALUES (:1, :2)"])
+        self.assertTrue(pool.rows == [(1, 2.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest, os, tempfile
+import numpy as np
+import pandas as pd
+from riipl import *
+
+
+class TestTensor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.population = pd.DataFrame({"RIIPL_ID": np.arange(8),
+                                        "SUBSET": ["TRAINING", "TESTING", "TRAINING", "VALIDATION"] * 2})
+        self.tensor = {"AGE": pd.DataFrame({"RIIPL_ID": [0, 1, 2, 4, 7], "VALUE": [10.0, 30.0, 20.0, 40.0, 50.0]}),
+                       "VISIT": pd.DataFrame({"RIIPL_ID": [0, 0, 2, 3], "TIMESTEP": [0, 2, 1, 2]}),
+                       "CONSTANT": pd.DataFrame({"RIIPL_ID": [0, 2], "VALUE": [0.0, 0.0]}),
+                       "UNSEEN": pd.DataFrame({"RIIPL_ID": [1], "VALUE": [3.0]})}
+        self.filename = os.path.join(self.tmp, "tensor.h5")
+        WriteTensor(self.tensor, {"AGE": "Age", "VISIT": "Visit"},
+                    {"AGE": "mean", "VISIT": 0, "CONSTANT": 0, "UNSEEN": 0},
+                    self.population, "RIIPL_ID", self.filename, nsteps=3)
+
+    def test_features(self):
+        with TensorReader(self.filename) as reader:
+            self.assertTrue(reader.features == ["AGE", "VISIT"])
+            self.assertTrue(reader.labels["AGE"] == "Age")
+            # Training values 10, 20, 40 are scaled by 1/40, with mean 70/3/40
+            self.assertTrue(np.isclose(reader.fill_values["AGE"], 70 / 3 / 40))
+            self.assertTrue([reader.nsamples(s) for s in ("train", "validate", "test")] == [4, 2, 2])
+
+    def test_batch(self):
+        with TensorReader(self.filename) as reader:
+            X = reader.batch("train", 0, 4)
+            self.assertTrue(X.shape == (4, 3, 2))
+            # Static AGE is broadcast across timesteps
+            self.assertTrue(np.allclose(X[:, :, 0], np.array([[0.25], [0.5], [1.0], [reader.fill[0]]])))
+            self.assertTrue(np.allclose(X[:, :, 1], [[1, 0, 1], [0, 1, 0], [0, 0, 0], [0, 0, 0]]))
+            batches = list(reader.minibatches("train", 3, shuffle=True))
+            self.assertTrue(sorted(len(b) for _, b in batches) == [1, 3])
+            for start, batch in batches:
+                self.assertTrue(np.allclose(batch, X[start:start + len(batch)]))
+
+
+if __name__ == "__main__":
+    unittest.main()